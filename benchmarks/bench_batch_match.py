@@ -0,0 +1,77 @@
+"""Benchmark of matching one abstract graph against many run branches.
+
+Matches an abstract graph of 1k tasks against 10 to 1k branches, once per
+branch with graph_diff_tasks on a copy of the abstract graph (as the run
+scripts did) and with a single BatchMatcher, which also computes the ready
+tasks of every branch.
+
+    python benchmarks/bench_batch_match.py
+"""
+import os
+import random
+import sys
+import time
+
+import networkx as nx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# pylint: disable=wrong-import-position
+from match import (  # noqa: E402
+    BatchMatcher,
+    graph_diff_tasks,
+    next_nodes_run,
+)
+
+ABSTRACT_TASKS = 1_000
+
+
+def abstract_graph():
+    """Return an abstract tree of tasks."""
+    graph = nx.relabel_nodes(
+        nx.gn_graph(ABSTRACT_TASKS, seed=1).reverse(), lambda n: f"task{n}"
+    )
+    nx.set_node_attributes(graph, {node: f"id-{node}" for node in graph}, "ID")
+    return graph
+
+
+def branch_provenances(number_of_branches):
+    """Return the provenance IDs of branches, each with 70% of the tasks run."""
+    rng = random.Random(number_of_branches)
+    return {
+        f"run{branch}": {
+            f"id-task{number}" for number in range(ABSTRACT_TASKS) if rng.random() < 0.7
+        }
+        for branch in range(number_of_branches)
+    }
+
+
+def per_branch(abstract, provenances):
+    """Match every branch on its own and list its next nodes."""
+    for id_index in provenances.values():
+        _, difference = graph_diff_tasks(abstract.copy(), None, id_index)
+        next_nodes_run(difference)
+
+
+def batch(abstract, provenances):
+    """Match all the branches at once and list their ready tasks."""
+    matcher = BatchMatcher(abstract, provenances)
+    matcher.ready_sets()
+    matcher.tasks_incomplete_in(len(provenances) // 2)
+
+
+def timed(function, *args):
+    """Return the duration of a call in milliseconds."""
+    start = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - start) * 1e3
+
+
+if __name__ == "__main__":
+    for branches in (10, 100, 1_000):
+        provenances = branch_provenances(branches)
+        print(
+            f"{branches:>5} branches:"
+            f" per branch {timed(per_branch, abstract_graph(), provenances):9.1f} ms"
+            f"  batch {timed(batch, abstract_graph(), provenances):8.1f} ms"
+        )
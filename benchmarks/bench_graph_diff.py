@@ -0,0 +1,95 @@
+"""Scaling benchmark of graph_diff_tasks.
+
+Matches an abstract graph of 1k tasks against provenance graphs of 1k to 1M
+nodes, with the former list based ID lookup (up to 100k nodes, it is
+quadratic) and with the provenance ID index, built per call or once and
+reused.
+
+    python benchmarks/bench_graph_diff.py
+"""
+import copy
+import os
+import sys
+import time
+
+import networkx as nx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# pylint: disable=wrong-import-position
+from match import graph_diff_tasks, provenance_id_index  # noqa: E402
+
+ABSTRACT_TASKS = 1_000
+LEGACY_LIMIT = 100_000
+
+
+def task_id(number):
+    """Return the ID of the task number, as built from its inputs and outputs."""
+    return f"python step.py,data/in-{number:07d}.csv,data/out-{number:07d}.csv"
+
+
+def abstract_graph():
+    """Return an abstract graph of tasks, every other one already run."""
+    graph = nx.DiGraph()
+    for number in range(ABSTRACT_TASKS):
+        run = number if number % 2 == 0 else -number
+        graph.add_node(f"task{number}", ID=task_id(run))
+    return graph
+
+
+def provenance_graph(number_of_nodes):
+    """Return a provenance graph of run tasks, each with an input and output."""
+    graph = nx.DiGraph()
+    for number in range(number_of_nodes // 3):
+        commit = f"{number:040x}"
+        graph.add_node(commit, ID=task_id(number))
+        for path in (f"data/in-{number:07d}.csv", f"data/out-{number:07d}.csv"):
+            graph.add_node(path, ID=path)
+        graph.add_edge(f"data/in-{number:07d}.csv", commit)
+        graph.add_edge(commit, f"data/out-{number:07d}.csv")
+    return graph
+
+
+def legacy_graph_diff_tasks(abstract, provenance):
+    """The former graph_diff_tasks, with a list of provenance IDs."""
+    prov_graph_id = list(nx.get_node_attributes(provenance, "ID").values())
+    difference = copy.deepcopy(abstract)
+    nodes_update = [n for n, v in abstract.nodes(data=True) if v["ID"] in prov_graph_id]
+    nx.set_node_attributes(abstract, "pending", "status")
+    nx.set_node_attributes(abstract, "grey", "node_color")
+    for node in nodes_update:
+        nx.set_node_attributes(abstract, {node: "complete"}, "status")
+        nx.set_node_attributes(abstract, {node: "green"}, "node_color")
+    difference.remove_nodes_from(
+        n for n, v in abstract.nodes(data=True) if v["status"] == "complete"
+    )
+    return abstract, difference
+
+
+def timed(function, *args, **kwargs):
+    """Return the result of a call and its duration in milliseconds."""
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1e3
+
+
+if __name__ == "__main__":
+    for size in (1_000, 10_000, 100_000, 1_000_000):
+        provenance = provenance_graph(size)
+        (_, difference), indexed = timed(graph_diff_tasks, abstract_graph(), provenance)
+        id_index, build = timed(provenance_id_index, provenance)
+        _, reused = timed(
+            graph_diff_tasks, abstract_graph(), provenance, id_index=id_index
+        )
+        legacy = "         -"
+        if size <= LEGACY_LIMIT:
+            (_, legacy_difference), legacy_time = timed(
+                legacy_graph_diff_tasks, abstract_graph(), provenance
+            )
+            assert set(legacy_difference) == set(difference)
+            legacy = f"{legacy_time:10.1f}"
+        print(
+            f"{provenance.number_of_nodes():>8} provenance nodes:"
+            f" list {legacy} ms  index {indexed:8.1f} ms"
+            f" (build {build:7.1f} ms, reused {reused:6.1f} ms)"
+        )
@@ -0,0 +1,82 @@
+"""Benchmark of the substitution of file handles in task commands.
+
+Substitutes the handles of 1k to 20k tasks, each reading 1 to 50 files, with
+the former replace loop over the handles of the task and with one
+HandleMatcher built for the whole translation map. The former loop
+corrupts handles that are a prefix of another one (``in1`` in ``in10``), so
+the results are only compared where they should agree, and the number of
+commands it corrupts is reported.
+
+    python benchmarks/bench_handle_substitution.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# pylint: disable=wrong-import-position
+from utilities import HandleMatcher  # noqa: E402
+
+
+def legacy_materialize(command, file_handles):
+    """The former _materialize_files_in_command."""
+    for handle, file in file_handles.items():
+        if handle in command:
+            command = command.replace(handle, str(file))
+    return command
+
+
+def workload(number_of_tasks):
+    """Return the translation map and the (command, handles) of the tasks."""
+    rng = random.Random(number_of_tasks)
+    mapping = {
+        f"in{number}": f"/data/inputs/sub-{number:06d}/image.nii.gz"
+        for number in range(number_of_tasks)
+    }
+    handles = list(mapping)
+    tasks = []
+    for number in range(number_of_tasks):
+        inputs = rng.sample(handles, rng.randint(1, 50))
+        task_handles = {handle: mapping[handle] for handle in inputs}
+        command = f"python process.py --output out{number} " + " ".join(
+            f"--input {handle}" for handle in inputs
+        )
+        tasks.append((command, task_handles))
+    return mapping, tasks
+
+
+if __name__ == "__main__":
+    for size in (1_000, 5_000, 20_000):
+        translation, commands = workload(size)
+
+        start = time.perf_counter()
+        legacy = [legacy_materialize(command, task) for command, task in commands]
+        legacy_time = (time.perf_counter() - start) * 1e3
+
+        start = time.perf_counter()
+        matcher = HandleMatcher(translation)
+        build = (time.perf_counter() - start) * 1e3
+        substituted = [matcher.substitute(command, task) for command, task in commands]
+        matcher_time = (time.perf_counter() - start) * 1e3
+
+        prefix_free = [
+            all(
+                other == handle or not other.startswith(handle)
+                for handle in task
+                for other in task
+            )
+            for _, task in commands
+        ]
+        assert all(
+            old == new
+            for old, new, check in zip(legacy, substituted, prefix_free)
+            if check
+        )
+        corrupted = sum(old != new for old, new in zip(legacy, substituted))
+        print(
+            f"{size:>6} handles: replace loop {legacy_time:8.1f} ms"
+            f" ({corrupted} commands corrupted)"
+            f"  matcher {matcher_time:8.1f} ms (build {build:6.1f} ms)"
+        )
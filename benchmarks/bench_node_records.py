@@ -0,0 +1,133 @@
+"""Memory benchmark of the provenance node records.
+
+Builds the provenance graph of synthetic run commits twice: with the former
+attribute dicts (one per file node, with a formatted date string) loaded
+through ``nx.DiGraph.add_nodes_from``, and with the slotted ``FileNode`` /
+``TaskNode`` records loaded into a ``ProvenanceGraph``. Reports the memory
+held by each graph as measured by tracemalloc.
+
+    python benchmarks/bench_node_records.py [number_of_file_nodes]
+"""
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+import networkx as nx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# pylint: disable=wrong-import-position
+from graphs import ProvenanceGraph  # noqa: E402
+from graphs.graph_provenance import run_commit_components  # noqa: E402
+from utilities import RunCommit  # noqa: E402
+
+FILES_PER_RUN = 10
+
+
+def run_commits(number_of_files):
+    """Return run commits, their records and file statuses.
+
+    Every run reads the outputs of the previous one, so most paths are
+    referenced by two commits, as in a processing pipeline.
+    """
+    runs = []
+    for run in range(number_of_files // FILES_PER_RUN):
+        inputs = [
+            f"derivatives/step-{run - 1:06d}/sub-{i:02d}_T1w.nii.gz"
+            for i in range(FILES_PER_RUN // 2)
+        ]
+        outputs = [
+            f"derivatives/step-{run:06d}/sub-{i:02d}_T1w.nii.gz"
+            for i in range(FILES_PER_RUN // 2)
+        ]
+        record = {
+            "cmd": "python process.py {inputs} {outputs}",
+            "inputs": inputs,
+            "outputs": outputs,
+        }
+        commit = RunCommit(f"{run:040x}", "author", 1_700_000_000 + run, "")
+        statuses = {path: f"{hash(path) & (2**160 - 1):040x}" for path in inputs}
+        statuses.update(
+            {path: f"{hash(path) + 1 & (2**160 - 1):040x}" for path in outputs}
+        )
+        runs.append((commit, record, statuses))
+    return runs
+
+
+def dict_components(commit, dict_o, file_statuses, superdataset_path, subdataset):
+    """The former prov_scan node and edge construction, with attribute dicts."""
+    node_list = []
+    edge_list = []
+    date = datetime.utcfromtimestamp(commit.authored_date).strftime("%Y-%m-%d %H:%M:%S")
+    task = {
+        "dataset": superdataset_path,
+        "command": dict_o["cmd"],
+        "commit": commit.hexsha,
+        "author": commit.author_name,
+        "date": date,
+        "inputs": ",".join(sorted(dict_o["inputs"])),
+        "outputs": ",".join(sorted(dict_o["outputs"])),
+        "ID": ",".join(sorted(dict_o["inputs"] + dict_o["outputs"] + [dict_o["cmd"]])),
+    }
+    for path in dict_o["inputs"] + dict_o["outputs"]:
+        file = {
+            "dataset": subdataset,
+            "path": path,
+            "commit": commit.hexsha,
+            "author": commit.author_name,
+            "date": datetime.utcfromtimestamp(commit.authored_date).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            ),
+            "status": file_statuses[path],
+            "ID": path,
+        }
+        node_list.append((path, file))
+        if path in dict_o["inputs"]:
+            edge_list.append((path, commit.hexsha))
+        else:
+            edge_list.append((commit.hexsha, path))
+    node_list.append((commit.hexsha, task))
+    return node_list, edge_list
+
+
+def graph_memory(runs, components, graph_type, add_nodes):
+    """Return the number of nodes and the memory (bytes) held by the graph."""
+    gc.collect()
+    tracemalloc.start()
+    graph = graph_type()
+    for commit, record, statuses in runs:
+        # The paths are parsed anew from every commit message
+        record = {
+            "cmd": record["cmd"],
+            "inputs": ["".join(path) for path in record["inputs"]],
+            "outputs": ["".join(path) for path in record["outputs"]],
+        }
+        nodes, edges = components(commit, record, statuses, "/super", "/super/sub")
+        add_nodes(graph, nodes)
+        graph.add_edges_from(edges)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return graph.number_of_nodes(), size
+
+
+if __name__ == "__main__":
+    NUMBER_OF_FILES = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    RUNS = run_commits(NUMBER_OF_FILES)
+    nodes_dicts, dicts = graph_memory(
+        RUNS, dict_components, nx.DiGraph, nx.DiGraph.add_nodes_from
+    )
+    nodes_records, records = graph_memory(
+        RUNS,
+        run_commit_components,
+        ProvenanceGraph,
+        ProvenanceGraph.add_records_from,
+    )
+    assert nodes_dicts == nodes_records
+    print(f"{len(RUNS)} run commits, {nodes_dicts} nodes")
+    print(f"attribute dicts {dicts / 2**20:8.1f} MiB")
+    print(
+        f"node records    {records / 2**20:8.1f} MiB  reduction x{dicts / records:.1f}"
+    )
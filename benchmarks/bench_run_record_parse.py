@@ -0,0 +1,113 @@
+"""Micro-benchmark of the run record parsers.
+
+Compares ``run_record_parse`` with the former regular expression based
+``commit_message_node_extract`` on datalad run records with 10, 1k and 100k
+input paths, and times the records datalad stores in a sidecar file
+(``datalad run --sidecar yes``), which the former parser could not read.
+
+    python benchmarks/bench_run_record_parse.py
+"""
+import functools
+import hashlib
+import json
+import lzma
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utilities import (  # noqa: E402 pylint: disable=wrong-import-position
+    RunCommit,
+    commit_message_node_extract,
+    run_record_parse,
+)
+
+
+def run_record(number_of_paths):
+    """Return a run record holding number_of_paths inputs."""
+    return {
+        "chain": [],
+        "cmd": "python process.py {inputs} {outputs}",
+        "dsid": "00000000-0000-0000-0000-000000000000",
+        "exit": 0,
+        "extra_inputs": [],
+        "inputs": [
+            f"sub-{i:06d}/anat/sub-{i:06d}_T1w.nii.gz" for i in range(number_of_paths)
+        ],
+        "outputs": ["derivatives/summary.tsv"],
+        "pwd": ".",
+    }
+
+
+def run_message(record):
+    """Return the message of a run commit, as written by datalad run."""
+    return (
+        "[DATALAD RUNCMD] Process the cohort\n\n"
+        "=== Do not change lines below ===\n"
+        f"{record}\n"
+        "^^^ Do not change lines above ^^^\n"
+    )
+
+
+def run_commit(number_of_paths):
+    """Return a run commit whose record holds number_of_paths inputs."""
+    record = json.dumps(run_record(number_of_paths), indent=1, sort_keys=True)
+    return RunCommit("0" * 40, "author", 0, run_message(record))
+
+
+def sidecar_commit(repo_path, number_of_paths):
+    """Commit a run record to a sidecar file, return the run commit."""
+    record = run_record(number_of_paths)
+    record_id = hashlib.md5(json.dumps(record).encode("utf-8")).hexdigest()
+    runinfo = os.path.join(repo_path, ".datalad", "runinfo")
+    os.makedirs(runinfo, exist_ok=True)
+    with lzma.open(os.path.join(runinfo, record_id), "wb") as sidecar:
+        sidecar.write(json.dumps(record).encode("utf-8") + b"\n")
+    message = run_message(json.dumps(record_id))
+    git = ["git", "-C", repo_path]
+    subprocess.run(git + ["add", "."], check=True)
+    subprocess.run(
+        git
+        + ["-c", "user.name=bench", "-c", "user.email=bench@example.com"]
+        + ["commit", "-q", "-m", message],
+        check=True,
+    )
+    hexsha = subprocess.run(
+        git + ["rev-parse", "HEAD"], capture_output=True, text=True, check=True
+    ).stdout.strip()
+    return RunCommit(hexsha, "bench", 0, message), record
+
+
+if __name__ == "__main__":
+    for size in (10, 1_000, 100_000):
+        commit = run_commit(size)
+        assert run_record_parse(commit.message) == commit_message_node_extract(commit)
+        repeat = max(1, 10_000 // size)
+        legacy = timeit.timeit(
+            lambda: commit_message_node_extract(commit), number=repeat
+        )
+        parser = timeit.timeit(lambda: run_record_parse(commit.message), number=repeat)
+        print(
+            f"{size:>7} paths:"
+            f" commit_message_node_extract {legacy / repeat * 1e3:10.3f} ms"
+            f" run_record_parse {parser / repeat * 1e3:8.3f} ms"
+            f"  speedup x{legacy / parser:.1f}"
+        )
+
+    with tempfile.TemporaryDirectory() as repo:
+        subprocess.run(["git", "init", "-q", repo], check=True)
+        for size in (10, 1_000, 100_000):
+            commit, expected = sidecar_commit(repo, size)
+            parse = functools.partial(
+                run_record_parse, commit.message, repo, commit.hexsha
+            )
+            assert parse() == expected
+            repeat = max(1, 1_000 // size)
+            sidecar = timeit.timeit(parse, number=repeat)
+            print(
+                f"{size:>7} paths: run_record_parse of a sidecar record"
+                f" {sidecar / repeat * 1e3:8.3f} ms"
+            )
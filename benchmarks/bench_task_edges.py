@@ -0,0 +1,66 @@
+"""Scaling benchmark of the edge derivation of task graphs.
+
+Derives the edges of workflows of 1k to 100k tasks, each reading the outputs
+of a few earlier tasks, with the former pairwise comparison of the tasks (up
+to 5k tasks, it is quadratic) and with the handle index of task_edges.
+
+    python benchmarks/bench_task_edges.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# pylint: disable=wrong-import-position
+from graphs import task_edges  # noqa: E402
+
+LEGACY_LIMIT = 5_000
+
+
+def workflow(number_of_tasks):
+    """Return the (task, attributes) tuples of a random task workflow."""
+    rng = random.Random(number_of_tasks)
+    nodes = []
+    for number in range(number_of_tasks):
+        inputs = [
+            f"out{rng.randrange(number)}-{rng.randrange(2)}"
+            for _ in range(rng.randint(1, 4) if number else 0)
+        ] or ["raw"]
+        outputs = [f"out{number}-0", f"out{number}-1"]
+        nodes.append((f"task{number}", {"inputs": inputs, "outputs": outputs}))
+    return nodes
+
+
+def legacy_task_edges(nodes):
+    """The former edge derivation of gcg_processing_tasks."""
+    edges = []
+    for node1 in nodes:
+        for node2 in nodes:
+            diff_set = set(node1[1]["outputs"]).intersection(set(node2[1]["inputs"]))
+            if diff_set:
+                edges.append((node1[0], node2[0]))
+    return edges
+
+
+def timed(function, *args):
+    """Return the result of a call and its duration in milliseconds."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1e3
+
+
+if __name__ == "__main__":
+    for size in (1_000, 5_000, 20_000, 100_000):
+        tasks = workflow(size)
+        (edges, _), indexed = timed(task_edges, tasks)
+        legacy = "         -"
+        if size <= LEGACY_LIMIT:
+            legacy_edges, legacy_time = timed(legacy_task_edges, tasks)
+            assert legacy_edges == edges
+            legacy = f"{legacy_time:10.1f}"
+        print(
+            f"{size:>7} tasks, {len(edges):>7} edges:"
+            f" pairwise {legacy} ms  index {indexed:8.1f} ms"
+        )
@@ -0,0 +1,62 @@
+"""Read time of large abstract workflow files.
+
+Writes workflow files of 10k to 300k task rows and reads them as
+gcg_processing_tasks formerly did (readlines, then line_process_task_v2
+splitting every line once per field) and with read_workflow.
+
+    python benchmarks/bench_workflow_reader.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# pylint: disable=wrong-import-position
+from utilities import line_process_task_v2, read_workflow  # noqa: E402
+
+
+def write_workflow(filename, number_of_tasks):
+    """Write a random workflow file of task rows."""
+    rng = random.Random(number_of_tasks)
+    with open(filename, "w", encoding="utf-8") as file_abstract:
+        for number in range(number_of_tasks):
+            inputs = ",".join(
+                f"data/out{rng.randrange(number)}.txt" if number else "data/raw.txt"
+                for _ in range(rng.randint(1, 4))
+            )
+            file_abstract.write(
+                f"T<>task{number}<>{inputs}<>data/out{number}.txt<>"
+                f"python code/step.py {inputs} data/out{number}.txt"
+                f"<>{rng.randint(1, 9)}<>main<>step {number}\n"
+            )
+
+
+def legacy_read(filename):
+    """The former parsing of gcg_processing_tasks."""
+    with open(filename, encoding="utf-8") as file_abstract:
+        lines = file_abstract.readlines()
+    return [("T", line_process_task_v2(line)) for line in lines]
+
+
+def timed(function, *args):
+    """Return the result of a call and its duration in milliseconds."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1e3
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        for size in (10_000, 100_000, 300_000):
+            path = os.path.join(directory, f"workflow{size}.txt")
+            write_workflow(path, size)
+            legacy_rows, legacy = timed(legacy_read, path)
+            rows, streamed = timed(read_workflow, path)
+            assert rows == legacy_rows
+            print(
+                f"{size:>7} tasks, {os.path.getsize(path) / 2**20:5.1f} MiB:"
+                f" readlines {legacy:8.1f} ms  read_workflow {streamed:8.1f} ms"
+            )
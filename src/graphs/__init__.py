@@ -1,16 +1,25 @@
 """Init module for graphs."""
 from utilities import (
+    GitTreeReader,
+    PathIndex,
     encode,
+    file_id,
     file_name_expansion,
+    full_path_from_partial,
+    get_dataset,
+    get_git_root,
+    get_repo,
+    get_superdataset,
     line_process_file,
     line_process_task,
     line_process_task_v2,
+    read_workflow,
     remove_space,
-    commit_message_node_extract,
-    full_path_from_partial,
-    get_commit_list,
-    get_git_root,
-    get_superdataset,
+    run_commits_count,
+    run_commits_iter,
+    run_record_parse,
+    task_id,
+    task_id_readable,
 )
 
 from .graph_analysis import (
@@ -23,13 +32,33 @@ from .graph_gen import (
     gcg_processing_tasks,
     graph_components_generator,
     graph_components_generator_from_file,
+    task_edges,
 )
+from .graph_index import ProvenanceIndex
 from .graph_plot import (
     graph_object_plot_abstract,
     graph_object_plot_provenance,
     graph_object_plot_task,
 )
-from .graph_provenance import prov_scan
+from .graph_provenance import (
+    RunComponentsBuilder,
+    prov_scan,
+    prov_scan_branches,
+    prov_scan_iter,
+    prov_scan_paths,
+)
+from .graph_records import (
+    FileNode,
+    NodeRecord,
+    ProvenanceGraph,
+    TaskNode,
+)
+from .graph_snapshot import (
+    prov_snapshot,
+    snapshot_read,
+    snapshot_write,
+)
+from .graph_watch import ProvenanceWatcher
 
 __all__ = [
     "graph_object_plot_abstract",
@@ -38,7 +67,21 @@ __all__ = [
     "graph_components_generator",
     "graph_components_generator_from_file",
     "gcg_processing_tasks",
+    "task_edges",
     "prov_scan",
+    "prov_scan_branches",
+    "prov_scan_iter",
+    "prov_scan_paths",
+    "ProvenanceIndex",
+    "RunComponentsBuilder",
+    "FileNode",
+    "NodeRecord",
+    "ProvenanceGraph",
+    "TaskNode",
+    "prov_snapshot",
+    "snapshot_read",
+    "snapshot_write",
+    "ProvenanceWatcher",
     "calc_betw_centrl",
     "deg_centrl",
     "eigen_centrl",
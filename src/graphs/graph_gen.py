@@ -3,11 +3,10 @@ import os
 
 import streamlit as st
 
-from . import (encode,
-               file_name_expansion,
-    line_process_file,
-    line_process_task,
-    line_process_task_v2,
+from . import (
+    file_id,
+    file_name_expansion,
+    read_workflow,
     remove_space,
 )
 
@@ -77,7 +76,8 @@ def process_file_node(files, prec_nodes, nodes, edges):
                     "status": "pending",
                     "node_color": "grey",
                     "predecessor": prec_nodes,
-                    "ID": encode(file),
+                    "ID": file_id(file),
+                    "ID_readable": file,
                 },
             )
         )
@@ -106,23 +106,13 @@ def graph_components_generator_from_file(filename):
     """
     nodes = []
     edges = []
-    with open(filename, encoding="utf-8") as file_abstract:
-        read_data = file_abstract.readlines()
-        for line in read_data:
-            stage_type = line.split("<>")[0].strip()
-            if stage_type == "T":
-                (
-                    task,
-                    prec_nodes,
-                    command,
-                    workflow,
-                ) = line_process_task(  # noqa: E501
-                    line
-                )
-                process_task_node(task, prec_nodes, command, workflow, nodes, edges)
-            elif stage_type == "F":
-                files, prec_nodes = line_process_file(line)
-                process_file_node(files, prec_nodes, nodes, edges)
+    for stage_type, values in read_workflow(filename, task_version=1):
+        if stage_type == "T":
+            task, prec_nodes, command, workflow = values
+            process_task_node(task, prec_nodes, command, workflow, nodes, edges)
+        elif stage_type == "F":
+            files, prec_nodes = values
+            process_file_node(files, prec_nodes, nodes, edges)
 
     return nodes, edges
 
@@ -206,6 +196,49 @@ def graph_components_generator(number_of_tasks):  # pylint: disable=too-many-loc
     return nodes, edges
 
 
+def task_edges(nodes):
+    """! Derive the edges of a task graph from the inputs and outputs of tasks
+
+    A task is connected to every task reading one of its outputs. Instead of
+    comparing every pair of tasks, the tasks reading each handle are indexed
+    once, so the cost follows the number of handles and edges. The edges are
+    listed in the order of the former pairwise comparison: by producer, then
+    by consumer, in the order of the nodes.
+
+    Args:
+        nodes (list): The (task, attributes) tuples, with "inputs" and
+        "outputs" lists of handles
+
+    Returns:
+        edges: A list of (producer, consumer) tuples
+        producers: A mapping of the handles written by more than one task to
+        the list of these tasks
+    """
+    consumers = {}
+    producers = {}
+    for position, (task, attributes) in enumerate(nodes):
+        for handle in dict.fromkeys(attributes["inputs"]):
+            consumers.setdefault(handle, []).append(position)
+        for handle in dict.fromkeys(attributes["outputs"]):
+            producers.setdefault(handle, []).append(task)
+
+    edges = []
+    for task, attributes in nodes:
+        readers = {
+            position
+            for handle in attributes["outputs"]
+            for position in consumers.get(handle, ())
+        }
+        edges.extend((task, nodes[position][0]) for position in sorted(readers))
+
+    multiple_producers = {
+        handle: tasks
+        for handle, tasks in producers.items()
+        if handle and len(tasks) > 1
+    }
+    return edges, multiple_producers
+
+
 def gcg_processing_tasks(filename):  # pylint: disable=too-many-locals
     """! This function generate a networkx graph from a file containing an
     abstract graph
@@ -216,42 +249,36 @@ def gcg_processing_tasks(filename):  # pylint: disable=too-many-locals
     Returns:
         nodes: A list of nodes
         edges: A list of edges
+        multiple_producers: A dict of the file handles that are an output of
+        several tasks, to the list of these tasks
     """
     nodes = []
-    edges = []
-    with open(filename, encoding="utf-8") as file_abstract:
-        read_data = file_abstract.readlines()
-        for item in read_data:
+    for stage_type, values in read_workflow(filename, task_version=2):
+        if stage_type != "T":
+            continue
+        (
+            task,
+            inputs,
+            outputs,
+            command,
+            pce,
+            subworkflow,
+            message,
+        ) = values
+        nodes.append(
             (
                 task,
-                inputs,
-                outputs,
-                command,
-                pce,
-                subworkflow,
-                message,
-            ) = line_process_task_v2(item)
-            nodes.append(
-                (
-                    task,
-                    {
-                        "description": task,
-                        "command": command,
-                        "inputs": inputs,
-                        "outputs": outputs,
-                        "message": message,
-                        "PCE": pce,
-                        "subworkflow": subworkflow,
-                    },
-                )
+                {
+                    "description": task,
+                    "command": command,
+                    "inputs": inputs,
+                    "outputs": outputs,
+                    "message": message,
+                    "PCE": pce,
+                    "subworkflow": subworkflow,
+                },
             )
+        )
 
-        for node1 in nodes:
-            for node2 in nodes:
-                diff_set = set(node1[1]["outputs"]).intersection(
-                    set(node2[1]["inputs"])
-                )
-                if diff_set:
-                    edges.append((node1[0], node2[0]))
-
-    return nodes, edges
+    edges, multiple_producers = task_edges(nodes)
+    return nodes, edges, multiple_producers
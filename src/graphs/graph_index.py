@@ -0,0 +1,216 @@
+"""Persistent index of the provenance components of datalad run commits"""
+import json
+import os
+import sqlite3
+
+from .graph_records import record_from_row
+
+INDEX_FILENAME = "pft_provenance.sqlite"
+INDEX_VERSION = 4
+
+
+def _nodes_dump(nodes):
+    """Serialize (node, record) tuples as (node, kind, row) lists.
+
+    The ``dataset`` (the first value of the rows of every record kind) is
+    left out, it is the path the dataset was scanned from and not a property
+    of the commit.
+    """
+    return json.dumps([(node, record.kind, record.row()[1:]) for node, record in nodes])
+
+
+def _nodes_load(nodes, datasets):
+    """Rebuild the (node, record) tuples serialized by _nodes_dump."""
+    return [
+        (node, record_from_row(kind, [datasets[kind], *row]))
+        for node, kind, row in json.loads(nodes)
+    ]
+
+
+class ProvenanceIndex:
+    """! An on-disk (SQLite) index of parsed run records
+
+    The index lives in the git directory of a dataset. For every
+    ``DATALAD RUNCMD`` commit it stores the nodes and edges derived from it,
+    keyed by the commit hexsha, without the dataset paths, which are given
+    when the components are read back. For every branch it keeps the ordered list of
+    indexed run commits and the last indexed head, so a scan only needs to
+    process the commits added after that head.
+    """
+
+    def __init__(self, git_dir):
+        """! Open (and create if needed) the index of a repository
+
+        Args:
+            git_dir (str): Path to the git directory of the dataset
+        """
+        self.path = os.path.join(git_dir, INDEX_FILENAME)
+        self.connection = sqlite3.connect(self.path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self._schema_create()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.connection.commit()
+        else:
+            self.connection.rollback()
+        self.connection.close()
+
+    def _schema_create(self):
+        """Create the tables, dropping them if they belong to an older version."""
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != INDEX_VERSION:
+            self.connection.executescript(
+                """
+                DROP TABLE IF EXISTS runs;
+                DROP TABLE IF EXISTS branch_runs;
+                DROP TABLE IF EXISTS branch_heads;
+                """
+            )
+        self.connection.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS runs (
+                hexsha TEXT PRIMARY KEY,
+                nodes TEXT NOT NULL,
+                edges TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS branch_runs (
+                branch TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                hexsha TEXT NOT NULL,
+                PRIMARY KEY (branch, position)
+            );
+            CREATE TABLE IF NOT EXISTS branch_heads (
+                branch TEXT PRIMARY KEY,
+                head TEXT NOT NULL
+            );
+            PRAGMA user_version = {INDEX_VERSION};
+            """
+        )
+
+    def indexed_head(self, branch):
+        """! Return the last indexed head of a branch
+
+        Args:
+            branch (str): The branch name
+
+        Returns:
+            str: The hexsha of the indexed head or None if never indexed
+        """
+        row = self.connection.execute(
+            "SELECT head FROM branch_heads WHERE branch = ?", (branch,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def has_run(self, hexsha):
+        """! Check whether a run commit has already been indexed
+
+        Args:
+            hexsha (str): The commit hexsha
+
+        Returns:
+            bool: True if the commit components are stored
+        """
+        row = self.connection.execute(
+            "SELECT 1 FROM runs WHERE hexsha = ?", (hexsha,)
+        ).fetchone()
+        return row is not None
+
+    def run_components(self, hexsha, datasets):
+        """! Return the nodes and edges stored for a run commit
+
+        Args:
+            hexsha (str): The commit hexsha
+            datasets (dict): The ``dataset`` of the records by kind, as built
+            by the scan, e.g. RunComponentsBuilder.datasets
+
+        Returns:
+            list, list: The node list and the edge list, or None if the
+            commit has not been indexed
+        """
+        row = self.connection.execute(
+            "SELECT nodes, edges FROM runs WHERE hexsha = ?", (hexsha,)
+        ).fetchone()
+        if row is None:
+            return None
+        return _nodes_load(row[0], datasets), [
+            tuple(edge) for edge in json.loads(row[1])
+        ]
+
+    def run_store(self, hexsha, nodes, edges):
+        """! Store the nodes and edges derived from a run commit
+
+        Args:
+            hexsha (str): The commit hexsha
+            nodes (list): A list of (node, record) tuples
+            edges (list): A list of (source, target) tuples
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO runs (hexsha, nodes, edges) VALUES (?, ?, ?)",
+            (hexsha, _nodes_dump(nodes), json.dumps(edges)),
+        )
+
+    def branch_reset(self, branch):
+        """! Forget the indexed history of a branch (e.g. after a rewrite)
+
+        Args:
+            branch (str): The branch name
+        """
+        self.connection.execute("DELETE FROM branch_runs WHERE branch = ?", (branch,))
+        self.connection.execute("DELETE FROM branch_heads WHERE branch = ?", (branch,))
+
+    def branch_extend(self, branch, hexshas, head):
+        """! Append run commits (oldest first) to a branch and move its head
+
+        Args:
+            branch (str): The branch name
+            hexshas (iterable): The run commit hexshas, oldest first. It is
+            consumed lazily so it can be a generator that indexes the commits
+            head (str): The hexsha of the new branch head
+        """
+        start = self.connection.execute(
+            "SELECT COALESCE(MAX(position), -1) + 1 FROM branch_runs WHERE branch = ?",
+            (branch,),
+        ).fetchone()[0]
+        for position, hexsha in enumerate(hexshas, start):
+            self.connection.execute(
+                "INSERT INTO branch_runs (branch, position, hexsha) VALUES (?, ?, ?)",
+                (branch, position, hexsha),
+            )
+        self.connection.execute(
+            "INSERT OR REPLACE INTO branch_heads (branch, head) VALUES (?, ?)",
+            (branch, head),
+        )
+
+    def branch_components(self, branch, datasets):
+        """! Return the nodes and edges of all the run commits of a branch
+
+        The components are returned newest commit first, the same order in
+        which ``repo.iter_commits`` walks the history.
+
+        Args:
+            branch (str): The branch name
+            datasets (dict): The ``dataset`` of the records by kind, see
+            run_components
+
+        Returns:
+            list, list: The node list and the edge list
+        """
+        node_list = []
+        edge_list = []
+        rows = self.connection.execute(
+            """
+            SELECT runs.nodes, runs.edges FROM branch_runs
+            JOIN runs ON runs.hexsha = branch_runs.hexsha
+            WHERE branch_runs.branch = ?
+            ORDER BY branch_runs.position DESC
+            """,
+            (branch,),
+        )
+        for nodes, edges in rows:
+            node_list.extend(_nodes_load(nodes, datasets))
+            edge_list.extend(tuple(edge) for edge in json.loads(edges))
+        return node_list, edge_list
@@ -55,7 +55,7 @@ def graph_object_plot_task(graph_input, fcolour="node_color"):
             ("label", "@label"),
             ("status", "@status"),
             ("node_color", "@node_color"),
-            ("ID", "@ID"),
+            ("ID", "@ID_readable"),
         ]
     )
     plot.add_tools(node_hover_tool, BoxZoomTool(), ResetTool())
@@ -123,7 +123,7 @@ def graph_object_plot_abstract(graph_input, fcolour="node_color"):
             ("label", "@label"),
             ("status", "@status"),
             ("node_color", "@node_color"),
-            ("ID", "@ID"),
+            ("ID", "@ID_readable"),
         ]
     )
     plot.add_tools(node_hover_tool, BoxZoomTool(), ResetTool())
@@ -165,8 +165,9 @@ def graph_object_plot_provenance(graph_input, fcolour="node_color"):
     mapping = dict((n, i) for i, n in enumerate(graph_input.nodes))
     relabeled_graph = nx.relabel_nodes(graph_input, mapping=mapping)
     for _, attrs in relabeled_graph.nodes(data=True):
-        attrs["ID"] = attrs["ID"].split(",")[-1]
-        print(attrs["ID"].split(",")[-1])
+        # The ID is a digest, the labels show the end of its readable form
+        attrs["ID_readable"] = attrs.get("ID_readable", attrs["ID"]).split(",")[-1]
+        print(attrs["ID_readable"])
 
     print(relabeled_graph.nodes(data=True))
 
@@ -197,7 +198,7 @@ def graph_object_plot_provenance(graph_input, fcolour="node_color"):
             ("command", "@command"),
             ("commit", "@commit"),
             ("date", "@date"),
-            ("ID", "@ID"),
+            ("ID", "@ID_readable"),
         ]
     )
     plot.add_tools(node_hover_tool, BoxZoomTool(), ResetTool())
@@ -207,7 +208,7 @@ def graph_object_plot_provenance(graph_input, fcolour="node_color"):
     x_coord, y_coord = zip(
         *graph.layout_provider.graph_layout.values()  # pylint: disable=no-member
     )
-    node_labels = nx.get_node_attributes(relabeled_graph, "ID")
+    node_labels = nx.get_node_attributes(relabeled_graph, "ID_readable")
     node_names = list(node_labels.values())
 
     source = ColumnDataSource({"x": x_coord, "y": y_coord, "ID": node_names})
@@ -1,112 +1,621 @@
 """Utilities for graph provenance"""
-from datetime import datetime
+import os
+import posixpath
+from concurrent import futures
+from contextlib import nullcontext
+from itertools import repeat
 
-import datalad.api as dl
 import git
 
 from . import (
-    commit_message_node_extract,
+    GitTreeReader,
+    PathIndex,
     full_path_from_partial,
-    get_commit_list,
+    get_dataset,
     get_git_root,
+    get_repo,
     get_superdataset,
+    run_commits_count,
+    run_commits_iter,
+    run_record_parse,
 )
+from .graph_index import ProvenanceIndex
+from .graph_records import FileNode, TaskNode
+
+
+def _file_node(file_path, file_status, subdataset, commit):
+    """! Build the node of a file referenced by a run commit
+
+    Args:
+        file_path (str): The path of the file as recorded in the run record
+        file_status (str): The gitshasum of the file
+        subdataset (str): Path to the dataset being scanned
+        commit (RunCommit): The run commit
+
+    Returns:
+        FileNode: The file node record
+    """
+    return FileNode(
+        subdataset,
+        file_path,
+        commit.hexsha,
+        commit.author_name,
+        commit.authored_date,
+        file_status,
+    )
+
+
+def run_commit_components(
+    commit, dict_o, file_statuses, superdataset_path, subdataset
+):  # pylint: disable=too-many-arguments
+    """! Return the nodes and edges derived from a single run commit
+
+    Args:
+        commit (RunCommit): A commit containing a DATALAD RUNCMD record
+        dict_o (dict): The run record of the commit
+        file_statuses (dict): A mapping of recorded file path to the
+        gitshasum it has in the commit
+        superdataset_path (str): Path to the superdataset
+        subdataset (str): Path to the dataset being scanned
+
+    Returns:
+        nodes: A list of (node, record) tuples
+        edges: A list of (source, target) tuples
+    """
+    node_list = []
+    edge_list = []
+    inputs = dict_o["inputs"]
+    outputs = dict_o["outputs"]
+    task = TaskNode(
+        superdataset_path,
+        dict_o["cmd"],
+        commit.hexsha,
+        commit.author_name,
+        commit.authored_date,
+        inputs,
+        outputs,
+    )
+
+    for input_file in inputs:
+        file = _file_node(input_file, file_statuses[input_file], subdataset, commit)
+        node_list.append((file.path, file))
+        edge_list.append((file.path, task.commit))
+    for output_file in outputs:
+        file = _file_node(output_file, file_statuses[output_file], subdataset, commit)
+        node_list.append((file.path, file))
+        edge_list.append((task.commit, file.path))
+    node_list.append((task.commit, task))
+
+    return node_list, edge_list
+
+
+class RunComponentsBuilder:
+    """! Build the provenance components of the run commits of a dataset
+
+    File statuses are read from the tree of each run commit through
+    long-lived ``git cat-file`` processes, so they identify the content the
+    run consumed and produced whatever branch is checked out, and never
+    change for a given commit. Recorded paths are relative to the run
+    directory of the dataset; partial paths that are not found that way are
+    located through an index of the superdataset working tree, built on first
+    use and shared by all the commits.
+    """
+
+    def __init__(self, superdataset_path, subdataset):
+        """! Prepare a builder for the run commits of a dataset
+
+        Args:
+            superdataset_path (str): Path to the superdataset
+            subdataset (str): Path to the dataset being scanned
+        """
+        self.superdataset_path = superdataset_path
+        self.subdataset = subdataset
+        # The dataset of the records, for the components read from the index
+        self.datasets = {"file": subdataset, "task": superdataset_path}
+        self.git_root = get_git_root(subdataset)
+        self.tree_reader = GitTreeReader()
+        self._path_index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tree_reader.close()
+
+    def file_status(self, commit, record, path):
+        """! Return the gitshasum a file recorded in a run has in its commit
+
+        Args:
+            commit (RunCommit): The run commit
+            record (dict): The run record of the commit
+            path (str): The file path as recorded in the run record
+
+        Returns:
+            str: The gitshasum or None if the file is not part of the commit
+        """
+        status = self.tree_reader.gitshasum(
+            self.git_root,
+            commit.hexsha,
+            os.path.normpath(os.path.join(record.get("pwd", "."), path)),
+        )
+        if status is not None:
+            return status
+
+        if self._path_index is None:
+            self._path_index = PathIndex(self.superdataset_path)
+        try:
+            full_path = full_path_from_partial(
+                self.superdataset_path, path, self._path_index
+            )
+        except FileNotFoundError:
+            return None
+        return self.tree_reader.gitshasum(
+            self.git_root,
+            commit.hexsha,
+            os.path.relpath(
+                os.path.join(
+                    os.path.realpath(os.path.dirname(full_path)),
+                    os.path.basename(full_path),
+                ),
+                self.git_root,
+            ),
+        )
+
+    def components(self, commit):
+        """! Return the nodes and edges derived from a run commit
+
+        Args:
+            commit (RunCommit): A commit containing a DATALAD RUNCMD record
+
+        Returns:
+            nodes: A list of (node, record) tuples
+            edges: A list of (source, target) tuples
+        """
+        record = run_record_parse(commit.message, self.git_root, commit.hexsha)
+        file_statuses = {
+            path: self.file_status(commit, record, path)
+            for path in record["inputs"] + record["outputs"]
+        }
+        return run_commit_components(
+            commit, record, file_statuses, self.superdataset_path, self.subdataset
+        )
+
+
+def _run_components(commit, builder, index=None):
+    """! Return the components of a run commit, from the index if stored
+
+    Args:
+        commit (RunCommit): A commit containing a DATALAD RUNCMD record
+        builder (RunComponentsBuilder): The builder for the run components
+        index (ProvenanceIndex): The index of the repository, if used
+
+    Returns:
+        nodes: A list of (node, record) tuples
+        edges: A list of (source, target) tuples
+    """
+    components = (
+        index.run_components(commit.hexsha, builder.datasets) if index else None
+    )
+    if components is None:
+        components = builder.components(commit)
+        if index:
+            index.run_store(commit.hexsha, *components)
+    return components
+
+
+def _index_run_commits(index, builder, repo_path, revision):
+    """! Index the run commits of a revision, yielding their hexshas oldest first
+
+    Commits already present in the index (e.g. shared with another branch)
+    are not parsed again.
+
+    Args:
+        index (ProvenanceIndex): The index of the repository
+        builder (RunComponentsBuilder): The builder for the run components
+        repo_path (str): Path to the repository
+        revision (str): A revision or revision range
+
+    Yields:
+        str: The hexsha of every run commit of the revision
+    """
+    for commit in run_commits_iter(repo_path, revision, reverse=True):
+        if not index.has_run(commit.hexsha):
+            index.run_store(commit.hexsha, *builder.components(commit))
+        yield commit.hexsha
+
+
+def _indexed_scan(
+    repo, dataset_branch, head, superdataset_path, subdataset
+):  # pylint: disable=too-many-arguments
+    """! Scan a branch through the provenance index of its repository
+
+    Only the run commits added after the last indexed head are parsed, the
+    components of the older ones are read back from the index. If the branch
+    history was rewritten the branch is indexed again from scratch (the
+    components of commits that are still reachable are reused).
+
+    Args:
+        repo (Repo): The repository of the dataset being scanned
+        dataset_branch (str): The branch to scan (the index key)
+        head (str): The hexsha of the commit the branch points to
+        superdataset_path (str): Path to the superdataset
+        subdataset (str): Path to the dataset being scanned
+
+    Returns:
+        nodes: A list of (node, record) tuples
+        edges: A list of (source, target) tuples
+    """
+    with ProvenanceIndex(repo.git_dir) as index:
+        indexed_head = index.indexed_head(dataset_branch)
+        if indexed_head != head:
+            revision = head
+            try:
+                if indexed_head is not None and repo.is_ancestor(indexed_head, head):
+                    revision = f"{indexed_head}..{head}"
+            except git.GitCommandError:  # the indexed head no longer exists
+                pass
+            if revision == head:
+                index.branch_reset(dataset_branch)
+
+            with RunComponentsBuilder(superdataset_path, subdataset) as builder:
+                index.branch_extend(
+                    dataset_branch,
+                    _index_run_commits(index, builder, repo.working_tree_dir, revision),
+                    head,
+                )
+
+        return index.branch_components(
+            dataset_branch, {"file": subdataset, "task": superdataset_path}
+        )
+
+
+def branch_head(repo, dataset_branch):
+    """! Return the branch a scan reads and the commit it points to
+
+    Subdatasets do not necessarily have the branch of the superdataset, in
+    that case the commit they have checked out (``HEAD``) is used.
+
+    Args:
+        repo (Repo): The repository of the dataset
+        dataset_branch (str): The requested branch
+
+    Returns:
+        str, str: The branch (or ``HEAD``) and the hexsha of its head
+    """
+    if dataset_branch in repo.heads:
+        return dataset_branch, repo.heads[dataset_branch].commit.hexsha
+    return "HEAD", repo.head.commit.hexsha
+
+
+def _dataset_scan(subdataset, dataset_branch, superdataset_path, use_index):
+    """! Return the nodes and edges of the run commits of one dataset
+
+    Args:
+        subdataset (str): Path to the dataset to scan
+        dataset_branch (str): The branch to scan
+        superdataset_path (str): Path to the superdataset
+        use_index (bool): Reuse (and update) the provenance index
+
+    Returns:
+        nodes: A list of (node, record) tuples
+        edges: A list of (source, target) tuples
+    """
+    repo = get_repo(subdataset)
+    dataset_branch, head = branch_head(repo, dataset_branch)
+
+    if use_index:
+        return _indexed_scan(repo, dataset_branch, head, superdataset_path, subdataset)
+
+    node_list = []
+    edge_list = []
+    with RunComponentsBuilder(superdataset_path, subdataset) as builder:
+        for commit in run_commits_iter(subdataset, head):
+            nodes, edges = builder.components(commit)
+            node_list.extend(nodes)
+            edge_list.extend(edges)
+    return node_list, edge_list
+
+
+def _prefix_components(nodes, edges, prefix):
+    """! Make the file paths of a subdataset relative to the scanned dataset
+
+    Run records hold paths relative to their own dataset, so the file nodes,
+    the task inputs and outputs and the edges of a subdataset are prefixed
+    with its path, e.g. ``d/b.txt`` of ``sub`` becomes ``sub/d/b.txt``, the
+    path the runs of the superdataset record for the same file.
+
+    Args:
+        nodes (list): The (node, record) tuples of the subdataset
+        edges (list): The (source, target) tuples of the subdataset
+        prefix (str): The path of the subdataset relative to the dataset
+
+    Returns:
+        nodes: A list of (node, record) tuples
+        edges: A list of (source, target) tuples
+    """
+
+    def prefixed(path):
+        return posixpath.normpath(posixpath.join(prefix, path))
+
+    files = set()
+    node_list = []
+    for node, record in nodes:
+        if record.kind == "file":
+            files.add(node)
+            record = record.copy(path=prefixed(record.path))
+            node = record.path
+        else:
+            record = record.copy(
+                input_paths=map(prefixed, record.input_paths),
+                output_paths=map(prefixed, record.output_paths),
+            )
+        node_list.append((node, record))
+    edge_list = [
+        tuple(prefixed(end) if end in files else end for end in edge) for edge in edges
+    ]
+    return node_list, edge_list
 
 
 def prov_scan(
-    dataset_path, dataset_branch
-):  # pylint: disable=too-many-statements, too-many-locals
+    dataset_path, dataset_branch, use_index=True, recursive=False, max_workers=None
+):
     """! This function will return the nodes and edges list
     Args:
-        ds_name (str): A path to the dataset (or subdataset)
+        dataset_path (str): A path to the dataset (or subdataset)
+        dataset_branch (str): The branch to scan
+        use_index (bool): Reuse (and update) the provenance index stored in
+        the git directory of the dataset instead of parsing every run commit
+        recursive (bool): Also scan all the installed subdatasets (at any
+        depth), each one in its own worker process. Their file paths are
+        made relative to dataset_path, so the runs of different datasets
+        share the nodes of the files they exchange
+        max_workers (int): The number of worker processes for a recursive
+        scan, by default the number of processors
     Returns:
-        graph: A networkx graph
+        nodes: A list of (node, record) tuples
+        edges: A list of (source, target) tuples
     """
     node_list = []
     edge_list = []
     superdataset = get_superdataset(dataset_path)
     subdatasets = [dataset_path]
-    for subdataset in subdatasets:
-        repo = git.Repo(subdataset)
-        commits = list(repo.iter_commits(repo.heads[dataset_branch]))
-        dl_run_commits = get_commit_list(commits)
-        for commit in dl_run_commits:
-            task = {}
-            dict_o = commit_message_node_extract(commit)
-            task["dataset"] = superdataset.path
-            task["command"] = dict_o["cmd"]
-            task["commit"] = commit.hexsha
-            task["author"] = commit.author.name
-            task["date"] = datetime.utcfromtimestamp(commit.authored_date).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )  # noqa: E501
-            task["inputs"] = ",".join(sorted(dict_o["inputs"]))
-            task["outputs"] = ",".join(sorted(dict_o["outputs"]))
-
-            # inputs_full_path = [
-            #     full_path_from_partial(superdataset.path, inp)
-            #     for inp in dict_o["inputs"]
-            # ]
-            # outputs_full_path = [
-            #     full_path_from_partial(superdataset.path, out)
-            #     for out in dict_o["outputs"]
-            # ]
-            inputs = dict_o["inputs"]
-            outputs = dict_o["outputs"]
-
-            full_task_description = inputs + outputs
-            full_task_description.append(dict_o["cmd"])
-            task["ID"] = ",".join(sorted(full_task_description))
-            if task["inputs"]:
-                for input_file in inputs:
-                    input_file_full_path = full_path_from_partial(
-                        superdataset.path, input_file
-                    )
-                    file = {}
-                    ds_file = git.Repo(get_git_root(input_file_full_path))  # noqa: E501
-                    file_status = dl.status(  # pylint: disable=no-member
-                        path=input_file_full_path, dataset=ds_file.working_tree_dir
-                    )[
-                        0
-                    ]  # noqa: E501
-                    file["dataset"] = subdataset
-                    file["path"] = input_file
-                    file["commit"] = commit.hexsha
-                    file["author"] = commit.author.name
-                    file["date"] = datetime.utcfromtimestamp(
-                        commit.authored_date
-                    ).strftime("%Y-%m-%d %H:%M:%S")
-                    file["status"] = file_status["gitshasum"]
-                    # file["ID"] = encode(input_file_full_path)
-                    file["ID"] = input_file
-
-                    node_list.append((file["path"], file))
-                    edge_list.append((file["path"], task["commit"]))
-            if task["outputs"]:
-                for output_file in outputs:
-                    output_file_full_path = full_path_from_partial(
-                        superdataset.path, output_file
+    if recursive:
+        subdatasets.extend(
+            get_dataset(dataset_path).subdatasets(
+                recursive=True,
+                state="present",
+                result_xfm="paths",
+                result_renderer="disabled",
+            )
+        )
+
+    if len(subdatasets) > 1:
+        with futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(
+                executor.map(
+                    _dataset_scan,
+                    subdatasets,
+                    repeat(dataset_branch),
+                    repeat(superdataset.path),
+                    repeat(use_index),
+                )
+            )
+    else:
+        results = [
+            _dataset_scan(dataset_path, dataset_branch, superdataset.path, use_index)
+        ]
+
+    for subdataset, (nodes, edges) in zip(subdatasets, results):
+        prefix = os.path.relpath(subdataset, dataset_path).replace(os.sep, "/")
+        if prefix != ".":
+            nodes, edges = _prefix_components(nodes, edges, prefix)
+        node_list.extend(nodes)
+        edge_list.extend(edges)
+
+    return node_list, edge_list
+
+
+def prov_scan_iter(
+    dataset_path, dataset_branch, chunk_size=100, progress=None, use_index=True
+):
+    """! Stream the nodes and edges of a branch in batches of run commits
+
+    Unlike prov_scan, nothing is accumulated: every batch is yielded as soon
+    as its run commits are parsed, newest commit first, so the components can
+    be rendered or written out while the history is still being scanned.
+    Adding the batches to a graph in order gives the graph of prov_scan.
+
+    Args:
+        dataset_path (str): A path to the dataset
+        dataset_branch (str): The branch to scan
+        chunk_size (int): The number of run commits per batch
+        progress (callable): Called after every batch with the number of run
+        commits processed and the number remaining
+        use_index (bool): Reuse (and update) the components stored in the
+        provenance index of the dataset
+
+    Yields:
+        nodes: A list of (node, record) tuples
+        edges: A list of (source, target) tuples
+    """
+    repo = get_repo(dataset_path)
+    _, head = branch_head(repo, dataset_branch)
+    superdataset = get_superdataset(dataset_path)
+    total = run_commits_count(dataset_path, head) if progress is not None else None
+
+    processed = 0
+    node_list = []
+    edge_list = []
+    with RunComponentsBuilder(superdataset.path, dataset_path) as builder, (
+        ProvenanceIndex(repo.git_dir) if use_index else nullcontext()
+    ) as index:
+        for commit in run_commits_iter(dataset_path, head):
+            nodes, edges = _run_components(commit, builder, index)
+            node_list.extend(nodes)
+            edge_list.extend(edges)
+            processed += 1
+
+            if processed % chunk_size == 0:
+                if use_index:  # keep what was parsed if the consumer stops
+                    index.connection.commit()
+                if progress is not None:
+                    progress(processed, max(total - processed, 0))
+                yield node_list, edge_list
+                node_list = []
+                edge_list = []
+
+        if processed % chunk_size or not processed:
+            if progress is not None:
+                progress(processed, 0)
+            if processed:
+                yield node_list, edge_list
+
+
+def _paths_overlap(path, paths):
+    """Return whether a path is one of paths, lies below or contains one."""
+    path = os.path.normpath(path)
+    for other in paths:
+        other = os.path.normpath(other)
+        if path == other or "." in (path, other):
+            return True
+        if path.startswith(other + "/") or other.startswith(path + "/"):
+            return True
+    return False
+
+
+def prov_scan_paths(
+    dataset_path, dataset_branch, paths, use_index=True, batch_size=1000
+):  # pylint: disable=too-many-locals
+    """! Return the upstream provenance of some paths of a branch
+
+    Only the run commits that modified the paths are visited, git limits the
+    history to them (``git log -- paths``). The runs among them that
+    recorded one of the paths, a file below one of them or a directory
+    containing one of them as an output are kept, and their inputs are
+    looked up the same way, until no new input is found. The result holds
+    the components of the runs in the upstream closure of the paths, the
+    runs that are ancestors of the paths in the prov_scan graph.
+
+    Paths are relative to the dataset root and compared with the paths
+    recorded in the run records (relative to the run directory), which are
+    the same for runs executed from the dataset root.
+
+    Args:
+        dataset_path (str): A path to the dataset
+        dataset_branch (str): The branch to scan
+        paths (iterable): The files or directories whose lineage is wanted
+        use_index (bool): Reuse (and update) the components stored in the
+        provenance index of the dataset
+        batch_size (int): The maximum number of paths per git call
+
+    Returns:
+        nodes: A list of (node, record) tuples, newest run commit first
+        edges: A list of (source, target) tuples
+    """
+    repo = get_repo(dataset_path)
+    _, head = branch_head(repo, dataset_branch)
+    superdataset = get_superdataset(dataset_path)
+
+    frontier = sorted({os.path.normpath(path) for path in paths})
+    visited_paths = set(frontier)
+    runs = {}
+    with RunComponentsBuilder(superdataset.path, dataset_path) as builder, (
+        ProvenanceIndex(repo.git_dir) if use_index else nullcontext()
+    ) as index:
+        while frontier:
+            inputs = set()
+            for start in range(0, len(frontier), batch_size):
+                batch = frontier[start : start + batch_size]
+                for commit in run_commits_iter(dataset_path, head, paths=batch):
+                    if commit.hexsha in runs:
+                        continue
+                    nodes, edges = _run_components(commit, builder, index)
+                    outputs = [
+                        target for source, target in edges if source == commit.hexsha
+                    ]
+                    # A directory output (-o data) also produced data/out.txt
+                    if not any(_paths_overlap(output, batch) for output in outputs):
+                        continue  # the run only touched the paths as a side effect
+                    runs[commit.hexsha] = commit.authored_date, nodes, edges
+                    inputs.update(
+                        source for source, target in edges if target == commit.hexsha
                     )
-                    file = {}
-                    ds_file = git.Repo(
-                        get_git_root(output_file_full_path)
-                    )  # noqa: E501
-                    file_status = dl.status(  # pylint: disable=no-member
-                        path=output_file_full_path, dataset=ds_file.working_tree_dir
-                    )[0]
-                    file["dataset"] = subdataset
-                    file["path"] = output_file
-                    file["commit"] = commit.hexsha
-                    file["author"] = commit.author.name
-                    file["date"] = datetime.utcfromtimestamp(
-                        commit.authored_date
-                    ).strftime("%Y-%m-%d %H:%M:%S")
-                    file["status"] = file_status["gitshasum"]
-                    # file["ID"] = encode(output_file_full_path)
-                    file["ID"] = output_file
-
-                    node_list.append((file["path"], file))
-                    edge_list.append((task["commit"], file["path"]))
-            node_list.append((task["commit"], task))
+            frontier = sorted(inputs - visited_paths)
+            visited_paths.update(frontier)
 
+    node_list = []
+    edge_list = []
+    for _, nodes, edges in sorted(runs.values(), key=lambda run: -run[0]):
+        node_list.extend(nodes)
+        edge_list.extend(edges)
     return node_list, edge_list
+
+
+def prov_scan_branches(
+    dataset_path, dataset_branches, base_branch=None, use_index=True
+):  # pylint: disable=too-many-locals
+    """! Return the nodes and edges lists of several branches at once
+
+    Run branches usually share most of their history with a base branch, so
+    instead of scanning every branch from its head the run commits of the
+    base branch are listed once and, for every other branch, git only walks
+    the commits that are not shared: the ones of the branch that are not in
+    the base (base..branch) and the ones of the base that are not in the
+    branch (branch..base), which are left out. Both ranges are exact whatever
+    the number of merge bases (e.g. after criss-cross merges). Every run
+    commit is parsed once no matter how many branches contain it.
+
+    Args:
+        dataset_path (str): A path to the dataset
+        dataset_branches (list): The branches to scan
+        base_branch (str): The branch the others fork from, by default the
+        branch checked out in the dataset
+        use_index (bool): Reuse (and update) the components stored in the
+        provenance index of the dataset
+
+    Returns:
+        dict: A mapping of branch name to its (nodes, edges) lists, newest
+        run commit first. The lists of different branches share the node and
+        edge tuples of their common run commits
+    """
+    repo = get_repo(dataset_path)
+    superdataset = get_superdataset(dataset_path)
+    if base_branch is None:
+        base_branch = (
+            dataset_branches[0] if repo.head.is_detached else repo.active_branch.name
+        )
+    base_head = repo.heads[base_branch].commit.hexsha
+
+    components = {}
+    with (
+        ProvenanceIndex(repo.git_dir) if use_index else nullcontext()
+    ) as index, RunComponentsBuilder(superdataset.path, dataset_path) as builder:
+
+        def run_hexshas(revision):
+            """Parse the run commits of a revision not seen yet, newest first."""
+            hexshas = []
+            for commit in run_commits_iter(dataset_path, revision):
+                if commit.hexsha not in components:
+                    components[commit.hexsha] = _run_components(commit, builder, index)
+                hexshas.append(commit.hexsha)
+            return hexshas
+
+        base_runs = run_hexshas(base_head)
+        branch_components = {}
+        for branch in dataset_branches:
+            head = repo.heads[branch].commit.hexsha
+            unique_runs = run_hexshas(f"{base_head}..{head}")
+            excluded = set(
+                commit.hexsha
+                for commit in run_commits_iter(dataset_path, f"{head}..{base_head}")
+            )
+
+            node_list = []
+            edge_list = []
+            for hexsha in unique_runs + [h for h in base_runs if h not in excluded]:
+                nodes, edges = components[hexsha]
+                node_list.extend(nodes)
+                edge_list.extend(edges)
+            branch_components[branch] = node_list, edge_list
+
+    return branch_components
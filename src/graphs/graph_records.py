@@ -0,0 +1,271 @@
+"""Compact node records for provenance graphs"""
+import abc
+import sys
+from collections.abc import MutableMapping
+from datetime import datetime
+
+import networkx as nx
+
+from . import (
+    file_id,
+    task_id,
+    task_id_readable,
+)
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_MISSING = object()
+
+
+def _intern(value):
+    """Intern strings so the paths, authors and commits are stored once."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class NodeRecord(MutableMapping):
+    """! Base of the slotted node records of provenance graphs
+
+    A record behaves as the attribute dict of a networkx node, but keeps the
+    values every node has in slots (``fields``, in the order taken by the
+    constructor) and derives others
+    (``_computed_keys``, e.g. the formatted date) when they are read. Only
+    the fields in ``_field_keys`` are node attributes, the others (e.g. the
+    integer timestamp) are read as attributes of the record, so a node has
+    the same attributes as the dicts the records replace. Any other
+    attribute set on the node, or a derived one that is overwritten, is
+    kept in a dict created on first use.
+    """
+
+    __slots__ = ("_extra",)
+    kind = None
+    fields = ()
+    _field_keys = ()
+    _computed_keys = ()
+
+    def row(self):
+        """! Return the stored values, in the order taken by the constructor
+
+        Returns:
+            tuple: The slot values of the record
+        """
+        return tuple(getattr(self, key) for key in self.fields)
+
+    @abc.abstractmethod
+    def _computed(self, key):
+        """Return the value of the derived attribute key."""
+
+    def __getitem__(self, key):
+        if self._extra is not None and key in self._extra:
+            value = self._extra[key]
+        elif key in self._field_keys:
+            value = getattr(self, key)
+        elif key in self._computed_keys:
+            value = self._computed(key)
+        else:
+            value = _MISSING
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self._field_keys:
+            setattr(self, key, _intern(value))
+            if self._extra is not None:
+                self._extra.pop(key, None)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        self[key]  # pylint: disable=pointless-statement
+        if key in self._field_keys:
+            setattr(self, key, _MISSING)
+        if self._extra is not None and key in self._extra:
+            del self._extra[key]
+        if key in self._computed_keys:
+            self[key] = _MISSING
+
+    def __iter__(self):
+        for key in self._field_keys + self._computed_keys:
+            try:
+                self[key]
+            except KeyError:
+                continue
+            yield key
+        if self._extra is not None:
+            for key, value in self._extra.items():
+                if value is _MISSING or key in self._field_keys:
+                    continue
+                if key not in self._computed_keys:
+                    yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def __reduce__(self):
+        return type(self), self.row(), self._extra
+
+    def __setstate__(self, state):
+        self._extra = state
+
+    def copy(self, **fields):
+        """! Return a shallow copy of the record
+
+        Args:
+            fields: Values replacing the ones of the record, by field
+
+        Returns:
+            NodeRecord: A record of the same type and attributes
+        """
+        record = type(self)(
+            *(fields.get(key, getattr(self, key)) for key in self.fields)
+        )
+        if self._extra is not None:
+            record._extra = dict(self._extra)
+        return record
+
+
+class FileNode(NodeRecord):
+    """! The node of a file referenced by a run commit
+
+    The ``date`` is derived from the integer ``timestamp`` of the commit, the
+    ``ID`` is the digest of the file path (``file_id``) and ``ID_readable``
+    the path itself.
+    """
+
+    __slots__ = ("dataset", "path", "commit", "author", "timestamp", "status")
+    kind = "file"
+    fields = __slots__
+    _field_keys = ("dataset", "path", "commit", "author", "status")
+    _computed_keys = ("date", "ID", "ID_readable")
+
+    def __init__(
+        self, dataset, path, commit, author, timestamp, status
+    ):  # pylint: disable=too-many-arguments
+        self._extra = None
+        self.dataset = _intern(dataset)
+        self.path = _intern(path)
+        self.commit = _intern(commit)
+        self.author = _intern(author)
+        self.timestamp = timestamp
+        self.status = _intern(status)
+
+    def _computed(self, key):
+        if key == "date":
+            return datetime.utcfromtimestamp(self.timestamp).strftime(DATE_FORMAT)
+        if key == "ID":
+            return file_id(self.path)
+        return self.path
+
+
+class TaskNode(NodeRecord):
+    """! The node of the task run by a run commit
+
+    The input and output paths are kept as sorted tuples sharing the
+    (interned) strings of the file nodes; the comma joined ``inputs``,
+    ``outputs`` and ``ID_readable`` attributes and the ``date`` are derived
+    on read. The ``ID`` digest (``task_id``) is computed once.
+    """
+
+    fields = (
+        "dataset",
+        "command",
+        "commit",
+        "author",
+        "timestamp",
+        "input_paths",
+        "output_paths",
+    )
+    __slots__ = fields + ("_id",)
+    kind = "task"
+    _field_keys = ("dataset", "command", "commit", "author")
+    _computed_keys = ("date", "inputs", "outputs", "ID", "ID_readable")
+
+    def __init__(
+        self, dataset, command, commit, author, timestamp, input_paths, output_paths
+    ):  # pylint: disable=too-many-arguments
+        self._extra = None
+        self.dataset = _intern(dataset)
+        self.command = command
+        self.commit = _intern(commit)
+        self.author = _intern(author)
+        self.timestamp = timestamp
+        self.input_paths = tuple(sorted(_intern(path) for path in input_paths))
+        self.output_paths = tuple(sorted(_intern(path) for path in output_paths))
+        self._id = task_id(self.input_paths, self.output_paths, command)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if key == "command":
+            self._id = task_id(self.input_paths, self.output_paths, self.command)
+
+    def _computed(self, key):
+        if key == "date":
+            return datetime.utcfromtimestamp(self.timestamp).strftime(DATE_FORMAT)
+        if key == "inputs":
+            return ",".join(self.input_paths)
+        if key == "outputs":
+            return ",".join(self.output_paths)
+        if key == "ID":
+            return self._id
+        return task_id_readable(self.input_paths, self.output_paths, self.command)
+
+
+RECORD_TYPES = {record.kind: record for record in (FileNode, TaskNode)}
+
+
+def record_from_row(kind, row):
+    """! Rebuild a node record from its kind and stored values
+
+    Args:
+        kind (str): The ``kind`` of the record
+        row (list): The values returned by ``NodeRecord.row``
+
+    Returns:
+        NodeRecord: The node record
+    """
+    return RECORD_TYPES[kind](*row)
+
+
+class ProvenanceGraph(nx.DiGraph):
+    """! A directed graph keeping provenance node records as they are
+
+    ``add_nodes_from`` copies the attributes of every node into a new dict;
+    ``add_records_from`` stores the records themselves as the node
+    attributes, so a graph of many files costs one small object per node.
+    """
+
+    def add_records_from(self, nodes):
+        """! Add (node, record) tuples, a later record replaces an earlier one
+
+        Args:
+            nodes (iterable): The (node, record) tuples
+        """
+        for node, record in nodes:
+            if node not in self._node:
+                self._succ[node] = self.adjlist_inner_dict_factory()
+                self._pred[node] = self.adjlist_inner_dict_factory()
+            self._node[node] = record
+        cache = getattr(self, "__networkx_cache__", None)
+        if cache:
+            cache.clear()
+
+    @classmethod
+    def from_components(cls, nodes, edges):
+        """! Build a provenance graph from the output of a provenance scan
+
+        Args:
+            nodes (list): A list of (node, record) tuples
+            edges (list): A list of (source, target) tuples
+
+        Returns:
+            ProvenanceGraph: The provenance graph
+        """
+        graph = cls()
+        graph.add_records_from(nodes)
+        graph.add_edges_from(edges)
+        return graph
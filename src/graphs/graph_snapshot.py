@@ -0,0 +1,183 @@
+"""Binary snapshots of provenance graphs keyed by branch head"""
+import os
+from urllib.parse import quote
+
+import pyarrow as pa
+from pyarrow import feather, ipc
+
+from . import get_repo
+from .graph_provenance import branch_head, prov_scan_iter
+from .graph_records import (
+    RECORD_TYPES,
+    ProvenanceGraph,
+    record_from_row,
+)
+
+SNAPSHOT_DIRECTORY = "pft_snapshots"
+SNAPSHOT_VERSION = "1"
+
+# One column per record slot, records leave the slots of other kinds null
+_NODE_SCHEMA = pa.schema(
+    [
+        ("node", pa.string()),
+        ("kind", pa.dictionary(pa.int8(), pa.string())),
+        ("dataset", pa.dictionary(pa.int32(), pa.string())),
+        ("path", pa.string()),
+        ("commit", pa.dictionary(pa.int32(), pa.string())),
+        ("author", pa.dictionary(pa.int32(), pa.string())),
+        ("timestamp", pa.int64()),
+        ("status", pa.string()),
+        ("command", pa.string()),
+        ("input_paths", pa.list_(pa.string())),
+        ("output_paths", pa.list_(pa.string())),
+    ]
+)
+_EDGE_SCHEMA = pa.schema([("source", pa.string()), ("target", pa.string())])
+
+
+def _snapshot_paths(git_dir, dataset_branch):
+    """Return the node and edge table files of a branch snapshot."""
+    name = quote(dataset_branch, safe="")
+    directory = os.path.join(git_dir, SNAPSHOT_DIRECTORY)
+    return (
+        os.path.join(directory, f"{name}.nodes.arrow"),
+        os.path.join(directory, f"{name}.edges.arrow"),
+    )
+
+
+def _snapshot_metadata(dataset_path, dataset_branch, head):
+    """Return the schema metadata identifying a snapshot."""
+    return {
+        b"version": SNAPSHOT_VERSION.encode(),
+        b"dataset": os.path.realpath(dataset_path).encode(),
+        b"branch": dataset_branch.encode(),
+        b"head": head.encode(),
+    }
+
+
+def _table_write(path, table, metadata):
+    """Write a table atomically, so readers never see a partial file."""
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(table.replace_schema_metadata(metadata), temporary_path)
+    os.replace(temporary_path, path)
+
+
+def snapshot_write(dataset_path, dataset_branch, head, nodes, edges):
+    """! Store the nodes and edges of a provenance scan as Arrow tables
+
+    Args:
+        dataset_path (str): A path to the dataset
+        dataset_branch (str): The branch (or ``HEAD``) scanned
+        head (str): The hexsha the branch pointed to when scanned
+        nodes (list): A list of (node, record) tuples
+        edges (list): A list of (source, target) tuples
+    """
+    columns = {name: [] for name in _NODE_SCHEMA.names}
+    for node, record in nodes:
+        columns["node"].append(node)
+        columns["kind"].append(record.kind)
+        values = dict(zip(record.fields, record.row()))
+        for name in _NODE_SCHEMA.names[2:]:
+            columns[name].append(values.get(name))
+
+    nodes_path, edges_path = _snapshot_paths(
+        get_repo(dataset_path).git_dir, dataset_branch
+    )
+    os.makedirs(os.path.dirname(nodes_path), exist_ok=True)
+    metadata = _snapshot_metadata(dataset_path, dataset_branch, head)
+    _table_write(
+        nodes_path, pa.Table.from_pydict(columns, schema=_NODE_SCHEMA), metadata
+    )
+    _table_write(
+        edges_path,
+        pa.Table.from_pydict(
+            {
+                "source": [source for source, _ in edges],
+                "target": [target for _, target in edges],
+            },
+            schema=_EDGE_SCHEMA,
+        ),
+        metadata,
+    )
+
+
+def snapshot_read(dataset_path, dataset_branch, head):
+    """! Return the nodes and edges of a snapshot if it matches a head
+
+    Args:
+        dataset_path (str): A path to the dataset
+        dataset_branch (str): The branch (or ``HEAD``) scanned
+        head (str): The hexsha the branch points to
+
+    Returns:
+        list, list: The (node, record) and (source, target) lists, or None
+        if there is no snapshot of the branch at that head
+    """
+    metadata = _snapshot_metadata(dataset_path, dataset_branch, head)
+    tables = []
+    for path in _snapshot_paths(get_repo(dataset_path).git_dir, dataset_branch):
+        try:
+            with pa.memory_map(path) as source, ipc.open_file(source) as reader:
+                if reader.schema.metadata != metadata:
+                    return None
+                tables.append(reader.read_all())
+        except (OSError, pa.ArrowInvalid):
+            return None
+    node_table, edge_table = tables
+
+    columns = {name: node_table[name].to_pylist() for name in _NODE_SCHEMA.names}
+    nodes = []
+    for index, (node, kind) in enumerate(zip(columns["node"], columns["kind"])):
+        row = [columns[key][index] for key in RECORD_TYPES[kind].fields]
+        nodes.append((node, record_from_row(kind, row)))
+    edges = list(
+        zip(edge_table["source"].to_pylist(), edge_table["target"].to_pylist())
+    )
+    return nodes, edges
+
+
+def prov_snapshot(dataset_path, dataset_branch, on_batch=None):
+    """! Return the provenance graph of a branch, from its snapshot if possible
+
+    The finished graph of every branch is kept as Arrow node and edge tables
+    in the git directory of the dataset, tagged with the dataset path, the
+    branch and the head it was built at. While the branch head does not move
+    the graph is read back from the tables; once it moves the graph is
+    scanned (through the provenance index) and the snapshot replaced.
+
+    Args:
+        dataset_path (str): A path to the dataset
+        dataset_branch (str): The branch to scan
+        on_batch (callable): Called while the graph is scanned, after every
+        batch of run commits, with the partial graph and the number of run
+        commits processed and remaining
+
+    Returns:
+        ProvenanceGraph: The provenance graph of the branch
+    """
+    dataset_branch, head = branch_head(get_repo(dataset_path), dataset_branch)
+    components = snapshot_read(dataset_path, dataset_branch, head)
+    if components is not None:
+        return ProvenanceGraph.from_components(*components)
+
+    graph = ProvenanceGraph()
+    node_list = []
+    edge_list = []
+    counts = [0, 0]
+
+    def progress(processed, remaining):
+        counts[:] = processed, remaining
+
+    for nodes, edges in prov_scan_iter(
+        dataset_path,
+        dataset_branch,
+        progress=progress if on_batch is not None else None,
+    ):
+        node_list.extend(nodes)
+        edge_list.extend(edges)
+        graph.add_records_from(nodes)
+        graph.add_edges_from(edges)
+        if on_batch is not None:
+            on_batch(graph, *counts)
+    snapshot_write(dataset_path, dataset_branch, head, node_list, edge_list)
+    return graph
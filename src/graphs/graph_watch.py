@@ -0,0 +1,162 @@
+"""Keep provenance graphs up to date as new run commits land"""
+import threading
+
+import git
+
+from . import (
+    get_repo,
+    get_superdataset,
+    run_commits_iter,
+)
+from .graph_provenance import RunComponentsBuilder, branch_head
+from .graph_snapshot import prov_snapshot
+
+
+class ProvenanceWatcher:
+    """! Patch the provenance graph of a branch when the branch moves
+
+    The branch ref is read straight from the git directory, which costs a
+    couple of small file reads, so it can be polled a few times per second.
+    When it moves, only the run commits between the previous and the new
+    head are parsed and their nodes and edges are added to the graph in
+    place. If the history was rewritten instead, the graph is rebuilt. The
+    components are added the way a full scan would produce them: a node
+    referenced by several run commits keeps the record of the oldest one.
+
+    ``poll`` checks the ref once; ``start`` polls it from a background
+    thread. Callbacks registered with ``subscribe`` are called with the
+    watcher, the new (node, record) and (source, target) lists and whether
+    the graph was rebuilt, e.g. to update a ``graph_diff_tasks`` result
+    with ``match.graph_diff_tasks_update`` or to subscribe the
+    ``provenance_update`` method of a ``match.IncrementalMatcher``.
+    """
+
+    def __init__(
+        self, dataset_path, dataset_branch, graph=None, interval=0.2, on_batch=None
+    ):  # pylint: disable=too-many-arguments
+        """! Start watching a branch of a dataset
+
+        Args:
+            dataset_path (str): A path to the dataset
+            dataset_branch (str): The branch to watch
+            graph (ProvenanceGraph): The provenance graph of the branch at its
+            current head, by default loaded with ``prov_snapshot``
+            interval (float): Seconds between two polls of the background
+            thread
+            on_batch (callable): Passed to ``prov_snapshot`` to follow the
+            initial scan of the branch
+        """
+        self.dataset_path = dataset_path
+        self.repo = get_repo(dataset_path)
+        self.dataset_branch, self.head = branch_head(self.repo, dataset_branch)
+        self.ref_path = (
+            "HEAD"
+            if self.dataset_branch == "HEAD"
+            else f"refs/heads/{self.dataset_branch}"
+        )
+        self.graph = (
+            graph
+            if graph is not None
+            else prov_snapshot(dataset_path, self.dataset_branch)
+        )
+        self.interval = interval
+        self.lock = threading.RLock()
+        self._callbacks = []
+        self._builder = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def subscribe(self, callback):
+        """! Register a function called after every update of the graph
+
+        Args:
+            callback (callable): Called with the watcher, the new nodes, the
+            new edges and whether the graph was rebuilt
+        """
+        self._callbacks.append(callback)
+
+    def ref_head(self):
+        """! Return the commit the watched ref points to
+
+        Returns:
+            str: The hexsha of the ref, read without running git
+        """
+        return git.SymbolicReference.dereference_recursive(self.repo, self.ref_path)
+
+    def poll(self):
+        """! Check the ref once and patch the graph if it moved
+
+        Returns:
+            list: The (node, record) tuples added to the graph
+        """
+        with self.lock:
+            head = self.ref_head()
+            if head == self.head:
+                return []
+
+            try:
+                rebuild = not self.repo.is_ancestor(self.head, head)
+            except git.GitCommandError:  # the previous head no longer exists
+                rebuild = True
+
+            if rebuild:
+                nodes, edges = self._components(head)
+                self.graph.clear()
+            else:
+                nodes, edges = self._components(f"{self.head}..{head}")
+            added = []
+            for node, record in nodes:
+                if node not in self.graph:
+                    self.graph.add_records_from([(node, record)])
+                    added.append((node, record))
+            self.graph.add_edges_from(edges)
+            self.head = head
+
+            for callback in self._callbacks:
+                callback(self, added, edges, rebuild)
+            return added
+
+    def _components(self, revision):
+        """Return the components of the run commits of a revision, oldest first."""
+        if self._builder is None:
+            self._builder = RunComponentsBuilder(
+                get_superdataset(self.dataset_path).path, self.dataset_path
+            )
+        node_list = []
+        edge_list = []
+        for commit in run_commits_iter(self.dataset_path, revision, reverse=True):
+            nodes, edges = self._builder.components(commit)
+            node_list.extend(nodes)
+            edge_list.extend(edges)
+        return node_list, edge_list
+
+    def start(self):
+        """! Poll the ref from a background thread every ``interval`` seconds"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, daemon=True)
+            self._thread.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except (git.GitError, OSError, ValueError) as err:
+                print(f"Provenance watcher of {self.dataset_path}: {err}")
+
+    def close(self):
+        """! Stop the background thread and the git processes of the watcher"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        with self.lock:
+            if self._builder is not None:
+                self._builder.tree_reader.close()
+                self._builder = None
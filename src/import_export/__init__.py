@@ -1,6 +1,11 @@
 """Init module for IO operations."""
 from .code_generation import generate_code
 from .graph_export import export_graph
-from .translation_file_read import translation_file_process
+from .translation_file_read import translation_branch_process, translation_file_process
 
-__all__ = ["generate_code", "export_graph", "translation_file_process"]
+__all__ = [
+    "generate_code",
+    "export_graph",
+    "translation_file_process",
+    "translation_branch_process",
+]
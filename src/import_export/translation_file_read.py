@@ -1,6 +1,8 @@
 """Docstring translation file"""
 import csv
 
+import git
+
 
 def translation_file_process(tf_filepath: str):
     """This function will open a file containing the mapping for the file handles
@@ -20,3 +22,24 @@ def translation_file_process(tf_filepath: str):
             node_mapping[row[0]] = row[1]
 
     return node_mapping
+
+
+def translation_branch_process(dataset_path: str, branch: str):
+    """This function will read the mapping for the file handles from the
+    translation file committed in a branch, so no checkout is needed
+
+    Args:
+        dataset_path (str): Path to the dataset containing tf.csv
+        branch (str): The branch to read the translation file from
+
+    Returns:
+        dict: A mapping of nodes specifying the translation from file
+        handle to file path
+    """
+    node_mapping = {}
+    translation_data = git.Repo(dataset_path).git.show(f"{branch}:tf.csv")
+    reader = csv.reader(translation_data.splitlines())
+    for row in reader:
+        node_mapping[row[0]] = row[1]
+
+    return node_mapping
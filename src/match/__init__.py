@@ -1,20 +1,51 @@
 """Init module for match."""
-from utilities import encode
+from utilities import (
+    HandleMatcher,
+    encode,
+    file_id,
+    get_gitshasums,
+    task_id,
+    task_id_readable,
+)
 
+from .batch import BatchMatcher
 from .difference import (
     graph_diff,
     graph_diff_tasks,
+    graph_diff_tasks_update,
+    graph_diff_view,
     graph_id_relabel,
     graph_remap_command,
     graph_remap_command_task,
     next_nodes_run,
+    provenance_id_index,
+)
+from .incremental import IncrementalMatcher
+from .ready import ReadyQueue
+from .scheduling import (
+    critical_path_lengths,
+    critical_path_priority,
+    simulate_schedule,
+    task_costs,
 )
+from .staleness import StalenessTracker
 
 __all__ = [
     "graph_diff",
     "graph_diff_tasks",
+    "graph_diff_tasks_update",
+    "graph_diff_view",
     "graph_id_relabel",
     "next_nodes_run",
     "graph_remap_command",
     "graph_remap_command_task",
+    "provenance_id_index",
+    "IncrementalMatcher",
+    "BatchMatcher",
+    "ReadyQueue",
+    "task_costs",
+    "critical_path_lengths",
+    "critical_path_priority",
+    "simulate_schedule",
+    "StalenessTracker",
 ]
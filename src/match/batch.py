@@ -0,0 +1,169 @@
+"""Matching of an abstract graph against many run branches at once"""
+import networkx as nx
+import numpy as np
+
+from .difference import (
+    _overlay_copy,
+    graph_diff_view,
+    graph_id_relabel,
+    provenance_id_index,
+)
+
+
+def _provenance_ids(provenance):
+    """Return the node IDs of a provenance graph, (nodes, edges) tuple or IDs."""
+    if isinstance(provenance, nx.Graph):
+        return provenance_id_index(provenance)
+    if isinstance(provenance, tuple):
+        nodes, _ = provenance
+        return {attrs["ID"] for _, attrs in nodes if "ID" in attrs}
+    return set(provenance)
+
+
+class BatchMatcher:
+    """! Match one abstract task graph against the provenance of many branches
+
+    The abstract graph is relabelled once per distinct node mapping (once if
+    the branches share their translation file), and the IDs of
+    its tasks are gathered in a single index of ID to task columns. Every
+    branch then costs one lookup per provenance node, and the results are
+    kept in a dense boolean completion matrix of branches by tasks.
+
+    A task is ready in a branch when it is not complete there but all its
+    predecessors are. The ready matrix is computed for all branches in one
+    sparse product of the pending matrix with the adjacency of the tasks,
+    and the summary queries (e.g. ``tasks_incomplete_in``) are reductions
+    of these matrices.
+    """
+
+    def __init__(self, abstract, provenances, mappings=None):
+        """! Match an abstract graph against the provenance of several branches
+
+        Args:
+            abstract (graph): An abstract graph of tasks, it is not modified
+            provenances (dict): A mapping of branch name to its provenance: a
+            provenance graph, the (nodes, edges) lists of ``prov_scan_branches``
+            or a set of provenance IDs
+            mappings (dict): A mapping of branch name to the node mapping its
+            abstract graph is relabelled with (see graph_id_relabel), by
+            default the abstract graph is matched as is
+        """
+        self.abstract = abstract
+        self.tasks = list(abstract)
+        self.branches = list(provenances)
+
+        # One relabelled graph and ID index per distinct node mapping
+        self._relabelled = {}
+        self._branch_keys = {}
+        id_indexes = {}
+        for branch in self.branches:
+            mapping = (mappings or {}).get(branch)
+            key = frozenset(mapping.items()) if mapping else None
+            self._branch_keys[branch] = key
+            if key in self._relabelled:
+                continue
+            graph = graph_id_relabel(abstract, mapping) if mapping else abstract
+            self._relabelled[key] = graph
+            id_index = {}
+            for column, node in enumerate(self.tasks):
+                relabelled_node = mapping.get(node, node) if mapping else node
+                id_index.setdefault(graph.nodes[relabelled_node]["ID"], []).append(
+                    column
+                )
+            id_indexes[key] = id_index
+
+        rows = []
+        columns = []
+        for row, branch in enumerate(self.branches):
+            id_index = id_indexes[self._branch_keys[branch]]
+            matched = [
+                column
+                for node_id in _provenance_ids(provenances[branch])
+                for column in id_index.get(node_id, ())
+            ]
+            rows.append(np.full(len(matched), row, dtype=np.intp))
+            columns.append(np.asarray(matched, dtype=np.intp))
+
+        self.complete = np.zeros((len(self.branches), len(self.tasks)), dtype=bool)
+        if rows:
+            self.complete[np.concatenate(rows), np.concatenate(columns)] = True
+
+        adjacency = nx.to_scipy_sparse_array(
+            abstract, nodelist=self.tasks, weight=None, dtype=np.int32, format="csr"
+        )
+        pending = ~self.complete
+        # waiting[b, t] is the number of pending predecessors of t in branch b
+        waiting = (adjacency.T @ pending.T.astype(np.int32)).T
+        self.ready = pending & (waiting == 0)
+
+    def _tasks(self, mask):
+        return [self.tasks[column] for column in np.flatnonzero(mask)]
+
+    def ready_sets(self):
+        """! Return the tasks ready to run in every branch
+
+        Returns:
+            dict: A mapping of branch name to the set of its ready tasks
+        """
+        return {
+            branch: set(self._tasks(self.ready[row]))
+            for row, branch in enumerate(self.branches)
+        }
+
+    def incomplete_counts(self):
+        """! Return the number of branches every task is not complete in
+
+        Returns:
+            dict: A mapping of task to its number of incomplete branches
+        """
+        counts = np.count_nonzero(~self.complete, axis=0)
+        return dict(zip(self.tasks, counts.tolist()))
+
+    def tasks_incomplete_in(self, more_than=0):
+        """! Return the tasks that are not complete in more than N branches
+
+        Args:
+            more_than (int): The number of branches to exceed
+
+        Returns:
+            list: The tasks, in the order of the abstract graph
+        """
+        return self._tasks(np.count_nonzero(~self.complete, axis=0) > more_than)
+
+    def branches_incomplete(self, task):
+        """! Return the branches in which a task is not complete
+
+        Args:
+            task (str): A node of the abstract graph
+
+        Returns:
+            list: The branch names
+        """
+        column = self.tasks.index(task)
+        return [self.branches[row] for row in np.flatnonzero(~self.complete[:, column])]
+
+    def progress(self):
+        """! Return the fraction of the tasks complete in every branch
+
+        Returns:
+            dict: A mapping of branch name to a fraction between 0 and 1
+        """
+        fractions = self.complete.mean(axis=1) if self.tasks else []
+        return dict(zip(self.branches, np.asarray(fractions).tolist()))
+
+    def branch_diff(self, branch):
+        """! Return the match of one branch, as graph_diff_tasks does
+
+        Args:
+            branch (str): One of the matched branches
+
+        Returns:
+            graphs: A copy of the (relabelled) abstract graph with the status
+            and colour of its nodes in the branch, and its difference view
+        """
+        row = self.branches.index(branch)
+        abstract = _overlay_copy(self._relabelled[self._branch_keys[branch]])
+        for node, complete in zip(abstract, self.complete[row].tolist()):
+            abstract.nodes[node]["status"] = "complete" if complete else "pending"
+            abstract.nodes[node]["node_color"] = "green" if complete else "grey"
+        return abstract, graph_diff_view(abstract)
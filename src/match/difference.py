@@ -1,31 +1,86 @@
 """Module for computing graph difference"""
-import copy
+from collections import ChainMap
 from pathlib import Path
 
 import networkx as nx
 
-from . import encode
+from . import (
+    HandleMatcher,
+    file_id,
+    task_id,
+    task_id_readable,
+)
 
 
 class FileHandleNotFound(Exception):
     """Exception when file handle is not found."""
 
 
-def graph_diff(abstract, provenance):
+def _overlay_copy(graph, mapping=None):
+    """! Return a copy of a graph with copy-on-write node attributes
+
+    The structure of the graph is copied, but every node gets a ChainMap of
+    an empty overlay and the attributes of the original node: values are
+    shared with the original graph until they are set on the copy, and
+    setting them never modifies the original.
+
+    Args:
+        graph (graph): The graph to copy
+        mapping (dict): Optional new labels of the nodes, as for
+        nx.relabel_nodes
+
+    Returns:
+        graph: The copy
+    """
+    mapping = mapping or {}
+    overlay = graph.__class__()
+    overlay.graph.update(graph.graph)
+    overlay.add_nodes_from(mapping.get(node, node) for node in graph)
+    for node, attrs in graph.nodes(data=True):
+        overlay._node[mapping.get(node, node)] = ChainMap(  # pylint: disable=W0212
+            {}, attrs
+        )
+    overlay.add_edges_from(
+        (mapping.get(source, source), mapping.get(target, target), attrs)
+        for source, target, attrs in graph.edges(data=True)
+    )
+    return overlay
+
+
+def provenance_id_index(provenance):
+    """! Build the index of the node IDs of a provenance graph
+
+    The index is a set, so matching an abstract node costs a single hash
+    lookup. It can be built once and passed to several matches against the
+    same provenance graph (and updated with the IDs of new nodes).
+
+    Args:
+        provenance (graph): A concrete or provenance graph
+
+    Returns:
+        set: The IDs of the provenance nodes
+    """
+    return {attrs["ID"] for _, attrs in provenance.nodes(data=True) if "ID" in attrs}
+
+
+def graph_diff(abstract, provenance, id_index=None):
     """! Calculate the difference of the abstract and provenance graphs
 
     Args:
         abstract (graph): An abstract graph
         provenance (graph): A concrete or provenance graph
+        id_index (set): The provenance_id_index of the provenance graph, built
+        here if not given
 
     Returns:
         graphs: An updated abstract graph with completed nodes for plotting and
         a graph containing the difference between the nodes. (abstract-concrete)
+        The difference is a read-only view of the abstract graph
     """
-    prov_graph_id = list(nx.get_node_attributes(provenance, "ID").values())
+    if id_index is None:
+        id_index = provenance_id_index(provenance)
 
-    difference = copy.deepcopy(abstract)
-    nodes_update = [n for n, v in abstract.nodes(data=True) if v["ID"] in prov_graph_id]
+    nodes_update = [n for n, v in abstract.nodes(data=True) if v["ID"] in id_index]
 
     for node in nodes_update:
         nx.set_node_attributes(abstract, {node: "complete"}, "status")
@@ -34,28 +89,46 @@ def graph_diff(abstract, provenance):
         elif abstract.nodes()[node]["type"] == "file":
             nx.set_node_attributes(abstract, {node: "red"}, "node_color")
 
-    difference.remove_nodes_from(n for n in abstract.nodes() if n in nodes_update)
+    completed = set(nodes_update)
+    difference = nx.subgraph_view(abstract, filter_node=lambda n: n not in completed)
 
     return abstract, difference
 
 
-def graph_diff_tasks(abstract, provenance):
+def graph_diff_view(abstract):
+    """! Return the difference graph of an abstract graph with task statuses
+
+    Args:
+        abstract (graph): An abstract graph whose nodes have a status
+
+    Returns:
+        graph: A read-only view of the abstract nodes that are not complete,
+        it follows later status updates (see graph_diff_tasks_update)
+    """
+    return nx.subgraph_view(
+        abstract, filter_node=lambda n: abstract.nodes[n]["status"] != "complete"
+    )
+
+
+def graph_diff_tasks(abstract, provenance, id_index=None):
     """! Calculate the difference of the abstract and provenance graphs
 
     Args:
         abstract (graph): An abstract graph
         provenance (graph): A concrete or provenance graph
+        id_index (set): The provenance_id_index of the provenance graph, built
+        here if not given
 
     Returns:
         graphs: An updated abstract graph with completed nodes for
         plotting and a graph containing the difference between the nodes.
-        (abstract-concrete)
+        (abstract-concrete) The difference is a read-only view of the
+        abstract graph
     """
-    prov_graph_id = list(nx.get_node_attributes(provenance, "ID").values())
-
-    difference = copy.deepcopy(abstract)
+    if id_index is None:
+        id_index = provenance_id_index(provenance)
 
-    nodes_update = [n for n, v in abstract.nodes(data=True) if v["ID"] in prov_graph_id]
+    nodes_update = [n for n, v in abstract.nodes(data=True) if v["ID"] in id_index]
 
     nx.set_node_attributes(abstract, "pending", "status")
     nx.set_node_attributes(abstract, "grey", "node_color")
@@ -64,15 +137,46 @@ def graph_diff_tasks(abstract, provenance):
         nx.set_node_attributes(abstract, {node: "complete"}, "status")
         nx.set_node_attributes(abstract, {node: "green"}, "node_color")
 
-    difference.remove_nodes_from(
-        n for n, v in abstract.nodes(data=True) if v["status"] == "complete"
-    )
+    difference = graph_diff_view(abstract)
 
     # In the difference graph the start_nodes is the list of nodes that can be
     # started (these should usually be a task)
     return abstract, difference
 
 
+def graph_diff_tasks_update(abstract, difference, provenance_nodes):
+    """! Patch the result of graph_diff_tasks with new provenance nodes
+
+    Instead of comparing the whole provenance graph again, only the nodes
+    added to it (e.g. by a ``ProvenanceWatcher``) are matched: the abstract
+    tasks they complete are marked as complete, in place, which also drops
+    them from the difference view.
+
+    Args:
+        abstract (graph): The abstract graph returned by graph_diff_tasks
+        difference (graph): The difference graph returned by graph_diff_tasks
+        provenance_nodes (list): The (node, attributes) tuples added to the
+        provenance graph
+
+    Returns:
+        list: The abstract nodes that were completed by the new nodes
+    """
+    new_ids = {attrs["ID"] for _, attrs in provenance_nodes if "ID" in attrs}
+    nodes_update = [
+        n
+        for n, v in abstract.nodes(data=True)
+        if v["ID"] in new_ids and v.get("status") != "complete"
+    ]
+
+    for node in nodes_update:
+        abstract.nodes[node]["status"] = "complete"
+        abstract.nodes[node]["node_color"] = "green"
+
+    if not nx.is_frozen(difference):  # a difference graph that is not a view
+        difference.remove_nodes_from(nodes_update)
+    return nodes_update
+
+
 def _neighbour_handles_for_node(
     graph, node: str, file_handles: dict[str, Path]
 ) -> dict[str, Path]:
@@ -98,12 +202,19 @@ def _file_handles_for_node(
     return {handle: file_handles[handle] for handle in node_handles}
 
 
-def _materialize_files_in_command(command: str, file_handles: dict[str, Path]) -> str:
-    """Inject input/output files into their handles in a command."""
-    for handle, file in file_handles.items():
-        if handle in command:
-            command = command.replace(handle, str(file))
-    return command
+def _materialize_files_in_command(
+    command: str,
+    file_handles: dict[str, Path],
+    matcher: HandleMatcher | None = None,
+) -> str:
+    """Inject input/output files into their handles in a command.
+
+    The matcher of the whole translation map can be passed to reuse it for
+    every task, only the handles of file_handles are replaced.
+    """
+    if matcher is None:
+        matcher = HandleMatcher(file_handles)
+    return matcher.substitute(command, file_handles)
 
 
 def graph_id_relabel(graph, nmap):
@@ -113,24 +224,25 @@ def graph_id_relabel(graph, nmap):
         graph (graph): A base graph object
         nmap (dict): Node remapping dictionary
     """
-    graph2remap = copy.deepcopy(graph)
-    graph2remap = nx.relabel_nodes(graph2remap, nmap)
+    graph2remap = _overlay_copy(graph, nmap)
     for node, attrs in graph2remap.nodes(data=True):
         if "type" in attrs:
             if attrs["type"] == "file":
-                # attrs["ID"] = encode(node)
-                attrs["ID"] = node
+                attrs["ID"] = file_id(node)
+                attrs["ID_readable"] = node
 
             elif attrs["type"] == "task":
-                full_task_description = list(nx.all_neighbors(graph2remap, node))
-                full_task_description.append(attrs["cmd"])
-                # attrs["ID"] = encode(",".join(sorted(full_task_description)))
-                attrs["ID"] = ",".join(sorted(full_task_description))
+                task_description = (
+                    list(graph2remap.predecessors(node)),
+                    list(graph2remap.successors(node)),
+                    attrs["cmd"],
+                )
+                attrs["ID"] = task_id(*task_description)
+                attrs["ID_readable"] = task_id_readable(*task_description)
         else:
-            full_task_description = attrs["inputs"] + attrs["outputs"]
-            full_task_description.append(attrs["command"])
-            # attrs["ID"] = encode(",".join(sorted(full_task_description)))
-            attrs["ID"] = ",".join(sorted(full_task_description))
+            task_description = (attrs["inputs"], attrs["outputs"], attrs["command"])
+            attrs["ID"] = task_id(*task_description)
+            attrs["ID_readable"] = task_id_readable(*task_description)
 
     return graph2remap
 
@@ -142,7 +254,8 @@ def graph_remap_command_task(graph, nmap):
         graph (graph): A base graph object
         nmap (dict): Node remapping
     """
-    graph2remap = copy.deepcopy(graph)
+    graph2remap = _overlay_copy(graph)
+    matcher = HandleMatcher(nmap)
 
     for node, attrs in graph2remap.nodes(data=True):
         node_handles_paths = _file_handles_for_node(attrs, nmap)
@@ -155,12 +268,12 @@ def graph_remap_command_task(graph, nmap):
         graph2remap.nodes[node]["inputs"] = inputs_paths
         graph2remap.nodes[node]["outputs"] = output_paths
 
-        full_task_description = inputs_paths + output_paths
-        full_task_description.append(attrs["command"])
-        graph2remap.nodes[node]["ID"] = encode(",".join(sorted(full_task_description)))
+        task_description = (inputs_paths, output_paths, attrs["command"])
+        graph2remap.nodes[node]["ID"] = task_id(*task_description)
+        graph2remap.nodes[node]["ID_readable"] = task_id_readable(*task_description)
         inputs_mapped.update(outputs_mapped)
         new_command = _materialize_files_in_command(
-            attrs["command"], node_handles_paths
+            attrs["command"], node_handles_paths, matcher
         )
         graph2remap.nodes[node]["command"] = new_command
 
@@ -174,7 +287,8 @@ def graph_remap_command(graph, nmap):
         graph (graph): A base graph object
         nmap (dict): Node remapping
     """
-    graph2remap = copy.deepcopy(graph)
+    graph2remap = _overlay_copy(graph)
+    matcher = HandleMatcher(nmap)
 
     for node, attrs in graph2remap.nodes(data=True):
         if attrs["type"] == "task":
@@ -190,14 +304,12 @@ def graph_remap_command(graph, nmap):
             graph2remap.nodes[node]["inputs"] = inputs_paths
             graph2remap.nodes[node]["outputs"] = output_paths
 
-            full_task_description = inputs_paths + output_paths
-            full_task_description.append(attrs["cmd"])
-            graph2remap.nodes[node]["ID"] = ",".join(
-                sorted(full_task_description)
-            )  # noqa: E501
+            task_description = (inputs_paths, output_paths, attrs["cmd"])
+            graph2remap.nodes[node]["ID"] = task_id(*task_description)
+            graph2remap.nodes[node]["ID_readable"] = task_id_readable(*task_description)
             inputs_mapped.update(outputs_mapped)
             new_command = _materialize_files_in_command(
-                attrs["cmd"], node_handles_paths
+                attrs["cmd"], node_handles_paths, matcher
             )
             graph2remap.nodes[node]["cmd"] = new_command
 
@@ -220,7 +332,8 @@ def end_nodes(self):
 
 def next_nodes_run(graph):
     """This function return the first node(s) in a tree or in the
-    case of a diff graph the next node scheduled to run
+    case of a diff graph the next node scheduled to run, every node is
+    checked (see ReadyQueue to follow the ready nodes as tasks complete)
     Returns:
         list: A list of starting nodes
     """
@@ -0,0 +1,90 @@
+"""Incremental matching of an abstract graph against a growing provenance"""
+from .difference import graph_diff_tasks, provenance_id_index
+from .ready import ReadyQueue
+
+
+class IncrementalMatcher:
+    """! Keep the match of an abstract task graph up to date
+
+    The full match (``graph_diff_tasks``) is computed once. After that, the
+    IDs of new provenance tasks are looked up in an index of the abstract
+    nodes by ID, and only the nodes they complete and their successors are
+    visited, through the ``ReadyQueue`` of the abstract graph. The cost of
+    an update follows the size of the delta, not the size of the graphs.
+    """
+
+    def __init__(self, abstract, provenance, id_index=None):
+        """! Match an abstract graph against the current provenance graph
+
+        Args:
+            abstract (graph): An abstract graph of tasks, updated in place
+            provenance (graph): A concrete or provenance graph
+            id_index (set): The provenance_id_index of the provenance graph,
+            built here if not given
+        """
+        self.abstract = abstract
+        self.nodes_by_id = {}
+        for node, attrs in abstract.nodes(data=True):
+            self.nodes_by_id.setdefault(attrs["ID"], []).append(node)
+        self.rematch(provenance, id_index)
+
+    def rematch(self, provenance, id_index=None):
+        """! Match the whole provenance graph again (e.g. after a rewrite)
+
+        Args:
+            provenance (graph): A concrete or provenance graph
+            id_index (set): The provenance_id_index of the provenance graph
+        """
+        if id_index is None:
+            id_index = provenance_id_index(provenance)
+        self.abstract, self.difference = graph_diff_tasks(
+            self.abstract, provenance, id_index
+        )
+        self.queue = ReadyQueue(self.abstract)
+
+    @property
+    def ready(self):
+        """! The tasks ready to run, see ``queue`` to take them"""
+        return set(self.queue)
+
+    def _pending(self, node):
+        return self.abstract.nodes[node]["status"] != "complete"
+
+    def update(self, new_ids):
+        """! Apply the IDs of new provenance nodes to the match
+
+        Args:
+            new_ids (iterable): The IDs of the nodes added to the provenance
+
+        Returns:
+            list: The tasks that became ready to run, in the order found
+        """
+        newly_ready = []
+        for node_id in new_ids:
+            for node in self.nodes_by_id.get(node_id, ()):
+                if not self._pending(node):
+                    continue
+                self.abstract.nodes[node]["status"] = "complete"
+                self.abstract.nodes[node]["node_color"] = "green"
+                newly_ready.extend(self.queue.done(node))
+        # A successor completed by the same delta is not ready any more
+        return [node for node in newly_ready if node in self.queue]
+
+    def provenance_update(self, watcher, nodes, edges, rebuild):
+        """! Follow a ``ProvenanceWatcher``, see its ``subscribe`` method
+
+        Args:
+            watcher (ProvenanceWatcher): The watcher of the provenance branch
+            nodes (list): The (node, record) tuples added to the provenance
+            edges (list): The (source, target) tuples added to the provenance
+            rebuild (bool): Whether the provenance graph was rebuilt
+
+        Returns:
+            list: The tasks that became ready to run
+        """
+        del edges  # the match only depends on the node IDs
+        if rebuild:
+            previously_ready = set(self.ready)
+            self.rematch(watcher.graph)
+            return [node for node in self.ready if node not in previously_ready]
+        return self.update(attrs["ID"] for _, attrs in nodes if "ID" in attrs)
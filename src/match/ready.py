@@ -0,0 +1,175 @@
+"""Queue of the tasks of a graph that are ready to run"""
+import heapq
+import itertools
+from collections import deque
+
+
+class ReadyQueue:
+    """! Follow the tasks of a graph that can run, as tasks complete
+
+    Every pending node keeps the number of its predecessors that are not
+    complete (its in-degree in the graph of pending nodes, as in Kahn's
+    algorithm) and is queued when that number drops to zero. Completing a
+    task only visits its successors and taking the next ready task is O(1)
+    amortised, so executors can consume the queue directly instead of
+    scanning the difference graph for its roots after every job.
+
+    With ``kind``, only the nodes of that type (e.g. the tasks of a graph of
+    files and tasks) are queued; the other nodes are complete as soon as
+    their predecessors are. Nodes without a type, as in the task graphs of
+    gcg_processing_tasks, are tasks. Ready tasks are taken in the order they became
+    ready, or by ``priority`` (see ``critical_path_priority``).
+    """
+
+    def __init__(self, graph, complete=None, kind=None, priority=None):
+        """! Queue the ready tasks of a graph
+
+        Args:
+            graph (graph): An abstract graph, it is not modified
+            complete (iterable): The nodes already complete, by default the
+            nodes whose status is "complete"
+            kind (str): The type of the nodes to queue, by default all nodes
+            priority (callable): A sort key of the nodes, the ready task with
+            the lowest key is taken first. By default the oldest ready task is
+        """
+        self.graph = graph
+        self.kind = kind
+        self.priority = priority
+        if complete is None:
+            complete = (
+                node
+                for node, status in graph.nodes(data="status")
+                if status == "complete"
+            )
+        self.complete = set(complete)
+        self.running = set()
+        self.waiting = {
+            node: sum(
+                1 for pred in graph.predecessors(node) if pred not in self.complete
+            )
+            for node in graph
+            if node not in self.complete
+        }
+        self._queue = deque() if priority is None else []
+        self._queued = set()
+        self._counter = itertools.count()  # keeps the heap order stable
+        self._release([node for node, count in self.waiting.items() if count == 0])
+
+    def __len__(self):
+        return len(self._queued)
+
+    def __contains__(self, node):
+        return node in self._queued
+
+    def __iter__(self):
+        """Iterate over the ready tasks without taking them, in pop order."""
+        if self.priority is None:
+            nodes = self._queue
+        else:
+            nodes = (node for *_, node in sorted(self._queue))
+        # A task taken then requeued is queued twice, the first one is popped
+        return iter(dict.fromkeys(node for node in nodes if node in self._queued))
+
+    def _push(self, node):
+        if self.priority is None:
+            self._queue.append(node)
+        else:
+            heapq.heappush(
+                self._queue, (self.priority(node), next(self._counter), node)
+            )
+        self._queued.add(node)
+
+    def _pop(self):
+        if self.priority is None:
+            return self._queue.popleft()
+        return heapq.heappop(self._queue)[-1]
+
+    def _release(self, nodes):
+        """Queue the nodes without pending predecessors, return the queued ones."""
+        released = []
+        stack = list(reversed(nodes))
+        while stack:
+            node = stack.pop()
+            if self.kind in (None, self.graph.nodes[node].get("type", "task")):
+                self._push(node)
+                released.append(node)
+            else:
+                stack.extend(reversed(self._complete(node)))
+        return released
+
+    def _complete(self, node):
+        """Mark a node complete, return its successors without pending inputs."""
+        self.complete.add(node)
+        self.waiting.pop(node, None)
+        self.running.discard(node)
+        self._queued.discard(node)  # left in the queue, skipped when popped
+        unblocked = []
+        for successor in self.graph.successors(node):
+            if successor in self.waiting:
+                self.waiting[successor] -= 1
+                if self.waiting[successor] == 0:
+                    unblocked.append(successor)
+        return unblocked
+
+    def pop(self):
+        """! Take the next ready task, it is then running until ``done``
+
+        Returns:
+            str: The node of the task
+
+        Raises:
+            IndexError: If no task is ready
+        """
+        while self._queue:
+            node = self._pop()
+            if node in self._queued:
+                self._queued.remove(node)
+                self.running.add(node)
+                return node
+        raise IndexError("pop from an empty ReadyQueue")
+
+    def take(self, node):
+        """! Take a given ready task, it is then running until ``done``
+
+        Args:
+            node (str): A ready node, e.g. found iterating over the queue
+
+        Raises:
+            KeyError: If the node is not ready
+        """
+        self._queued.remove(node)  # left in the queue, skipped when popped
+        self.running.add(node)
+
+    def requeue(self, node):
+        """! Put a running task back in the queue, e.g. after a failed job
+
+        Args:
+            node (str): A node taken with ``pop``
+        """
+        if node in self.running:
+            self.running.remove(node)
+            self._push(node)
+
+    def done(self, node):
+        """! Mark a task complete and queue the tasks it unblocks
+
+        The task does not need to be taken with ``pop`` first, e.g. when it
+        was completed by another run.
+
+        Args:
+            node (str): A node of the graph
+
+        Returns:
+            list: The tasks that became ready, in the order queued
+        """
+        if node in self.complete:
+            return []
+        return self._release(self._complete(node))
+
+    def finished(self):
+        """! Whether all the tasks of the graph are complete
+
+        Returns:
+            bool: True if no task is pending, ready or running
+        """
+        return not self.waiting
@@ -0,0 +1,134 @@
+"""Scheduling order of the pending tasks of an abstract graph"""
+import heapq
+import itertools
+
+import networkx as nx
+
+from .ready import ReadyQueue
+
+
+def task_costs(graph, runtimes=None, default=1.0):
+    """! Return the expected cost of every node of an abstract graph
+
+    The cost of a task is its measured runtime if known, else its PCE (the
+    cost estimate entered with the task), else ``default``. File nodes cost
+    nothing.
+
+    Args:
+        graph (graph): An abstract graph
+        runtimes (dict): Measured (e.g. historical) runtimes of the tasks, by
+        node
+        default (float): The cost of a task without runtime or PCE
+
+    Returns:
+        dict: A mapping of node to its cost
+    """
+    runtimes = runtimes or {}
+    costs = {}
+    for node, attrs in graph.nodes(data=True):
+        if attrs.get("type") == "file":
+            costs[node] = 0.0
+        elif node in runtimes:
+            costs[node] = float(runtimes[node])
+        else:
+            try:
+                costs[node] = float(attrs.get("PCE")) or default
+            except (TypeError, ValueError):
+                costs[node] = default
+    return costs
+
+
+def critical_path_lengths(graph, costs):
+    """! Return the length of the longest path from every node to a sink
+
+    The length of a path is the sum of the costs of its nodes, the node
+    itself included, so a task with a long chain of expensive descendants
+    gets a large value.
+
+    Args:
+        graph (graph): A directed acyclic graph
+        costs (dict): The cost of every node, see task_costs
+
+    Returns:
+        dict: A mapping of node to the length of its critical path
+    """
+    lengths = {}
+    for node in reversed(list(nx.topological_sort(graph))):
+        lengths[node] = costs[node] + max(
+            (lengths[successor] for successor in graph.successors(node)), default=0.0
+        )
+    return lengths
+
+
+def _fan_out(graph, node):
+    """Return the number of tasks reading the outputs of a node."""
+    consumers = set()
+    for successor in graph.successors(node):
+        if graph.nodes[successor].get("type") == "file":
+            consumers.update(graph.successors(successor))
+        else:
+            consumers.add(successor)
+    return len(consumers)
+
+
+def critical_path_priority(graph, runtimes=None):
+    """! Return the critical path scheduling keys of the nodes of a graph
+
+    Ready tasks sorted by these keys start with the one heading the most
+    expensive remaining chain of tasks, then with the one unblocking the
+    most tasks, then in the order of the graph. On wide graphs with uneven
+    costs this keeps the long chains going while the short ones fill the
+    idle workers.
+
+    Args:
+        graph (graph): An abstract graph, usually the difference graph of the
+        pending tasks
+        runtimes (dict): Measured runtimes of the tasks, see task_costs
+
+    Returns:
+        dict: A mapping of node to its sort key, e.g. for
+        ``sorted(nodes, key=keys.get)`` or ``ReadyQueue(priority=keys.get)``
+    """
+    lengths = critical_path_lengths(graph, task_costs(graph, runtimes))
+    return {
+        node: (-lengths[node], -_fan_out(graph, node), order)
+        for order, node in enumerate(graph)
+    }
+
+
+def simulate_schedule(
+    graph, workers=1, priority=None, costs=None, kind=None
+):  # pylint: disable=too-many-arguments
+    """! Simulate running the pending tasks of a graph on a pool of workers
+
+    Every worker takes the next task of a ReadyQueue as soon as it is free
+    and the task takes its cost to run.
+
+    Args:
+        graph (graph): An abstract graph
+        workers (int): The number of tasks running at the same time
+        priority (callable): The priority of the queue, by default the tasks
+        are taken in the order they became ready (FIFO)
+        costs (dict): The cost of every node, by default task_costs
+        kind (str): The type of the nodes to run, see ReadyQueue
+
+    Returns:
+        float, list: The time the last task completes, and the (node, start,
+        finish) tuples of the tasks in the order they started
+    """
+    if costs is None:
+        costs = task_costs(graph)
+    queue = ReadyQueue(graph, kind=kind, priority=priority)
+    counter = itertools.count()
+    running = []
+    schedule = []
+    now = 0.0
+    while True:
+        while len(running) < workers and queue:
+            node = queue.pop()
+            schedule.append((node, now, now + costs[node]))
+            heapq.heappush(running, (now + costs[node], next(counter), node))
+        if not running:
+            return now, schedule
+        now, _, node = heapq.heappop(running)
+        queue.done(node)
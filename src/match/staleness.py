@@ -0,0 +1,189 @@
+"""Make-style staleness of provenance runs from the hashes of their files"""
+import heapq
+import os
+
+from . import get_gitshasums
+
+
+class StalenessTracker:
+    """! Find the runs of a provenance whose inputs changed since they ran
+
+    A provenance ID only tells that a task ran once, not that its outputs
+    are still up to date. Every run commit records the gitshasum (the file
+    ``status``) of the files it read and wrote, and the tracker compares
+    the hashes a run read with the current ones: the hash given for the
+    file (e.g. read from the working tree), or else the one written by the
+    last run producing it. A run is stale if one of its inputs changed or
+    is produced by a stale run, so staleness flows downstream as in make.
+
+    Only the last run of every task (ID) is considered, older runs of the
+    same task are superseded. The rerun set is the stale runs: matching the
+    abstract graph against ``fresh_ids`` instead of every provenance ID
+    leaves their tasks pending, and only the outdated work is scheduled.
+
+    Changes are applied incrementally: new file hashes (``files_changed``)
+    and new runs (``add_runs``) only re-evaluate the runs downstream of the
+    files they touch, in the order the runs ran.
+    """
+
+    def __init__(self, nodes, current=None, newest_first=True):
+        """! Index the runs of a provenance
+
+        Args:
+            nodes (list): The (node, record) tuples of the provenance, as
+            returned by prov_scan (one file record per run referencing it)
+            current (dict): The current hash of the files, by recorded path
+            newest_first (bool): Whether the runs are listed newest first, as
+            by prov_scan, or oldest first
+        """
+        self.runs = {}  # commit -> task record
+        self.files = {}  # commit -> {path: status in the run commit}
+        self.datasets = {}  # path -> dataset of the file
+        self.order = {}  # commit -> position of the run, oldest first
+        self.latest = {}  # task ID -> commit of its last run
+        self.producers = {}  # path -> commit of the last run writing it
+        self.consumers = {}  # path -> commits of the runs reading it
+        self.current = {}
+        self.stale = set()
+        self.add_runs(nodes, newest_first)
+        if current:
+            self.files_changed(current)
+
+    def add_runs(self, nodes, newest_first=True):
+        """! Add the components of new runs, newer than the known ones
+
+        Args:
+            nodes (list): The (node, record) tuples of the new runs
+            newest_first (bool): Whether the runs are listed newest first
+
+        Returns:
+            list: The runs that became stale, oldest first
+        """
+        runs = []
+        files = {}
+        for _, record in nodes:
+            if getattr(record, "kind", None) == "task":
+                runs.append(record)
+            elif getattr(record, "kind", None) == "file":
+                files.setdefault(record.commit, {})[record.path] = record.status
+                self.datasets.setdefault(record.path, record.dataset)
+        if newest_first:
+            runs.reverse()
+
+        changed = []
+        for record in runs:
+            commit = record.commit
+            self.runs[commit] = record
+            self.files[commit] = files.get(commit, {})
+            self.order[commit] = len(self.order)
+            if record["ID"] in self.latest:  # the previous run is superseded
+                changed.append(self.latest[record["ID"]])
+            self.latest[record["ID"]] = commit
+            for path in record.input_paths:
+                self.consumers.setdefault(path, set()).add(commit)
+            for path in record.output_paths:
+                self.producers[path] = commit
+            changed.append(commit)
+        return self._refresh(changed + self._consumers_of(self._outputs(changed)))
+
+    def files_changed(self, hashes):
+        """! Set the current hash of files, e.g. after they were edited
+
+        Args:
+            hashes (dict): The new hash of the files, by recorded path
+
+        Returns:
+            list: The runs that became stale, oldest first
+        """
+        self.current.update(hashes)
+        return self._refresh(self._consumers_of(hashes))
+
+    def check_working_tree(self):
+        """! Compare the inputs of the runs with the files checked out
+
+        Returns:
+            list: The runs that became stale, oldest first
+        """
+        paths = {
+            os.path.join(self.datasets[path], path): path
+            for path in self.consumers
+            if path in self.datasets
+        }
+        return self.files_changed(
+            {
+                paths[file_path]: shasum
+                for file_path, shasum in get_gitshasums(paths).items()
+            }
+        )
+
+    def _outputs(self, commits):
+        return [path for commit in commits for path in self.runs[commit].output_paths]
+
+    def _consumers_of(self, paths):
+        return [commit for path in paths for commit in self.consumers.get(path, ())]
+
+    def _live(self, commit):
+        return self.latest[self.runs[commit]["ID"]] == commit
+
+    def _hash(self, path):
+        """Return the current hash of a file, None if it is not known."""
+        if path in self.current:
+            return self.current[path]
+        producer = self.producers.get(path)
+        return None if producer is None else self.files[producer].get(path)
+
+    def _is_stale(self, commit):
+        if not self._live(commit):
+            return False
+        for path in self.runs[commit].input_paths:
+            current = self._hash(path)
+            recorded = self.files[commit].get(path)
+            if None not in (current, recorded) and current != recorded:
+                return True
+            producer = self.producers.get(path)
+            if producer in self.stale and self.order[producer] < self.order[commit]:
+                return True
+        return False
+
+    def _refresh(self, commits):
+        """Re-evaluate runs and their consumers, return the newly stale ones."""
+        heap = [(self.order[commit], commit) for commit in set(commits)]
+        heapq.heapify(heap)
+        queued = set(commits)
+        newly_stale = []
+        while heap:
+            _, commit = heapq.heappop(heap)
+            queued.discard(commit)
+            stale = self._is_stale(commit)
+            if stale == (commit in self.stale):
+                continue
+            if stale:
+                self.stale.add(commit)
+                newly_stale.append(commit)
+            else:
+                self.stale.discard(commit)
+            for consumer in self._consumers_of(self.runs[commit].output_paths):
+                if consumer not in queued:
+                    queued.add(consumer)
+                    heapq.heappush(heap, (self.order[consumer], consumer))
+        # A run made stale then fresh by the same change is not reported
+        return [commit for commit in newly_stale if commit in self.stale]
+
+    def stale_ids(self):
+        """! Return the IDs of the tasks to run again
+
+        Returns:
+            set: The IDs of the stale runs
+        """
+        return {self.runs[commit]["ID"] for commit in self.stale}
+
+    def fresh_ids(self, id_index):
+        """! Remove the IDs of stale tasks from a provenance ID index
+
+        Args:
+            id_index (set): The provenance_id_index of the provenance
+
+        Returns:
+            set: The IDs of the provenance that are up to date
+        """
+        return id_index - self.stale_ids()
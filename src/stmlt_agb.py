@@ -47,20 +47,23 @@ def match_graphs(provenance_ds_path, gdb_abstract, ds_branch):
         gdb_abstract (graph): An abstract graph
     """
 
-    repo = git.Repo(provenance_ds_path)
-    branch = repo.heads[ds_branch]
-    branch.checkout()
-    node_mapping = import_export.translation_file_process(
-        f"{provenance_ds_path}/tf.csv"
+    # Both the translation file and the provenance are read from the branch
+    # itself, so the branch does not need to be checked out
+    node_mapping = import_export.translation_branch_process(
+        provenance_ds_path, ds_branch
     )
 
     if utilities.exists_case_sensitive(provenance_ds_path):
-        nodes_provenance, edges_provenance = graphs.prov_scan(
-            provenance_ds_path, ds_branch
+        progress_bar = st.progress(0.0, text="Scanning the run commits")
+        gdb_provenance = graphs.prov_snapshot(
+            provenance_ds_path,
+            ds_branch,
+            on_batch=lambda _, processed, remaining: progress_bar.progress(
+                processed / max(processed + remaining, 1),
+                text=f"{processed} run commits scanned, {remaining} remaining",
+            ),
         )
-        gdb_provenance = nx.DiGraph()
-        gdb_provenance.add_nodes_from(nodes_provenance)
-        gdb_provenance.add_edges_from(edges_provenance)
+        progress_bar.empty()
 
         gdb_abstract = match.graph_remap_command(gdb_abstract, node_mapping)
         gdb_abstract = match.graph_id_relabel(gdb_abstract, node_mapping)
@@ -95,13 +98,14 @@ def run_pending_nodes(scheduler_instance, provenance_ds_path, gdb_difference, br
     # we need to use the translation file so the nodes in the difference tree have the
     # file names instead of the abstract names. From the nodes we can extract the list
     # of inputs and outputs for the job that is going to run
-    node_mapping = import_export.translation_file_process(
-        f"{provenance_ds_path}/tf.csv"
-    )
+    node_mapping = import_export.translation_branch_process(provenance_ds_path, branch)
 
     gdb_difference = match.graph_id_relabel(gdb_difference, node_mapping)
     print("graph_diff", gdb_difference.nodes(data=True), "\n")
 
+    # datalad run commits to the branch checked out, it must be the matched one
+    git.Repo(provenance_ds_path).heads[branch].checkout()
+
     try:
         next_nodes_run = st.session_state["next_nodes_req"]
         print(
@@ -4,7 +4,6 @@ Docstring
 import argparse
 import ast
 import cProfile
-import csv
 import os
 from pathlib import Path
 
@@ -57,7 +56,6 @@ def graph_components_generator(number_of_tasks):  # pylint: disable=too-many-loc
         outputs: A list of output files
     """
     nodes = []
-    edges = []
     for i in range(number_of_tasks):
         container = st.container()
         with container:
@@ -142,13 +140,11 @@ def graph_components_generator(number_of_tasks):  # pylint: disable=too-many-loc
                 )
             )
 
-    for node1 in nodes:
-        for node2 in nodes:
-            diff_set = set(node1[1]["outputs"]).intersection(
-                set(node2[1]["inputs"])
-            )  # noqa: E501
-            if diff_set:
-                edges.append((node1[0], node2[0]))
+    edges, multiple_producers = graphs.task_edges(nodes)
+    for handle, tasks in multiple_producers.items():
+        st.warning(
+            f"The file handle {handle} is an output of several tasks: {', '.join(tasks)}"
+        )
 
     return nodes, edges
 
@@ -336,24 +332,26 @@ def match_graphs(provenance_ds_path, gdb_abstract, ds_branch):
         provenance_ds_path (str)`: The path to the provenance dataset
         gdb_abstract (graph): An abstract graph
     """
-    node_mapping = {}
-    repo = git.Repo(provenance_ds_path)
-    branch = repo.heads[ds_branch]
-    branch.checkout()
-    with open(
-        f"{provenance_ds_path}/tf.csv", "r", encoding="utf-8"
-    ) as translation_file:
-        reader = csv.reader(translation_file)
-        for row in reader:
-            node_mapping[row[0]] = f"{provenance_ds_path}{row[1]}"
+    # Both the translation file and the provenance are read from the branch
+    # itself, so the branch does not need to be checked out
+    node_mapping = {
+        handle: f"{provenance_ds_path}{path}"
+        for handle, path in import_export.translation_branch_process(
+            provenance_ds_path, ds_branch
+        ).items()
+    }
 
     if utilities.exists_case_sensitive(provenance_ds_path):
-        nodes_provenance, edges_provenance = graphs.prov_scan(
-            provenance_ds_path, ds_branch
+        progress_bar = st.progress(0.0, text="Scanning the run commits")
+        gdb_provenance = graphs.prov_snapshot(
+            provenance_ds_path,
+            ds_branch,
+            on_batch=lambda _, processed, remaining: progress_bar.progress(
+                processed / max(processed + remaining, 1),
+                text=f"{processed} run commits scanned, {remaining} remaining",
+            ),
         )
-        gdb_provenance = nx.DiGraph()
-        gdb_provenance.add_nodes_from(nodes_provenance)
-        gdb_provenance.add_edges_from(edges_provenance)
+        progress_bar.empty()
 
         gdb_abstract = match.graph_remap_command_task(gdb_abstract, node_mapping)
         gdb_abstract = match.graph_id_relabel(gdb_abstract, node_mapping)
@@ -365,7 +363,11 @@ def match_graphs(provenance_ds_path, gdb_abstract, ds_branch):
             graph_plot_diff = graphs.graph_object_plot_task(gdb_abstract)
             plot_graph(graph_plot_diff)
 
-            next_nodes_requirements = match.next_nodes_run(gdb_difference)
+            # Dispatch the tasks heading the longest (by PCE) chains first
+            priority = match.critical_path_priority(gdb_difference)
+            next_nodes_requirements = sorted(
+                match.next_nodes_run(gdb_difference), key=priority.get
+            )
 
         if "next_nodes_req" not in st.session_state:
             st.session_state["next_nodes_req"] = next_nodes_requirements
@@ -393,16 +395,18 @@ def run_pending_nodes(
     # we need to use the translation file so the nodes in the difference tree have the
     # file names instead of the abstract names. From the nodes we can extract the
     # list of inputs and outputs for the job that is going to run
-    node_mapping = {}
-    with open(
-        f"{provenance_ds_path}/tf.csv", "r", encoding="utf-8"
-    ) as translation_file:
-        reader = csv.reader(translation_file)
-        for row in reader:
-            node_mapping[row[0]] = f"{provenance_ds_path}{row[1]}"
+    node_mapping = {
+        handle: f"{provenance_ds_path}{path}"
+        for handle, path in import_export.translation_branch_process(
+            provenance_ds_path, branch
+        ).items()
+    }
 
     gdb_difference = match.graph_id_relabel(gdb_difference, node_mapping)
 
+    # datalad run commits to the branch checked out, it must be the matched one
+    git.Repo(provenance_ds_path).heads[branch].checkout()
+
     try:
         next_nodes = st.session_state["next_nodes_req"]
         for item in next_nodes:
@@ -549,7 +553,14 @@ if __name__ == "__main__":
     edge_list = None  # pylint: disable=invalid-name
 
     if args.agraph:
-        node_list, edge_list = graphs.gcg_processing_tasks(args.agraph)
+        node_list, edge_list, multiple_producers = graphs.gcg_processing_tasks(
+            args.agraph
+        )
+        for handle, tasks in multiple_producers.items():
+            st.warning(
+                f"The file handle {handle} is an output of several tasks: "
+                f"{', '.join(tasks)}"
+            )
 
     else:
         tasks_number = st.number_input("Please define a number of stages", min_value=1)
@@ -3,6 +3,7 @@ Docstring
 """
 import argparse
 import cProfile
+import time
 
 import networkx as nx
 import streamlit as st
@@ -12,6 +13,12 @@ from . import graphs, utilities
 
 profiler = cProfile.Profile()
 
+# The partial graph is redrawn at most every REDRAW_SECONDS, and at least
+# REDRAW_FACTOR times its last layout time apart, as the layout of a growing
+# graph gets slower
+REDRAW_SECONDS = 5.0
+REDRAW_FACTOR = 4
+
 st.set_page_config(layout="wide")
 st.write(
     """
@@ -28,6 +35,45 @@ def export_graph(**kwargs):
         st.sidebar.text(f"{expt}")
 
 
+def scan_progress():
+    """! Return a callback showing the progress of a provenance scan
+
+    The callback updates a progress bar after every batch of run commits
+    and renders the partial provenance graph from time to time, the graphviz
+    layout of every batch would make the first scan of a long history
+    quadratic.
+
+    Returns:
+        callable: A callback for the ``on_batch`` argument of
+        ``graphs.prov_snapshot``
+    """
+    progress_bar = st.progress(0.0, text="Scanning the run commits")
+    partial_plot = st.empty()
+    redraw = {"next": time.monotonic() + REDRAW_SECONDS}
+
+    def on_batch(graph, processed, remaining):
+        progress_bar.progress(
+            processed / max(processed + remaining, 1),
+            text=f"{processed} run commits scanned, {remaining} remaining",
+        )
+        if (
+            remaining != 0
+            and len(graph.nodes) != 0
+            and time.monotonic() >= redraw["next"]
+        ):
+            start = time.monotonic()
+            partial_plot.bokeh_chart(
+                graphs.graph_object_plot_provenance(graph), use_container_width=True
+            )
+            end = time.monotonic()
+            redraw["next"] = end + max(REDRAW_SECONDS, REDRAW_FACTOR * (end - start))
+        if remaining == 0:
+            progress_bar.empty()
+            partial_plot.empty()
+
+    return on_batch
+
+
 def git_log_parse(ds_name, ds_branch):
     """! This function will generate the graph of the entire project
     Args:
@@ -35,10 +81,16 @@ def git_log_parse(ds_name, ds_branch):
         a_option (str): An analysis mode for the node calculation
     """
     try:
-        nodes_provenance, edges_provenance = graphs.prov_scan(ds_name, ds_branch)
-        gdb_provenance = nx.DiGraph()
-        gdb_provenance.add_nodes_from(nodes_provenance)
-        gdb_provenance.add_edges_from(edges_provenance)
+        # The watcher survives Streamlit reruns, so a rerun only parses the
+        # run commits added since the previous one
+        watcher_key = f"provenance_watcher:{ds_name}:{ds_branch}"
+        if watcher_key not in st.session_state:
+            st.session_state[watcher_key] = graphs.ProvenanceWatcher(
+                ds_name, ds_branch, on_batch=scan_progress()
+            )
+        watcher = st.session_state[watcher_key]
+        watcher.poll()
+        gdb_provenance = watcher.graph
     except ValueError as err:
         st.warning(
             f"Error creating graph object. Please check that your path contains a valid Datalad dataset {err}"  # noqa: E501
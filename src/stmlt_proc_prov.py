@@ -37,13 +37,17 @@ def run_cleaning_worktree(super_ds):
     utilities.job_clean(super_ds)
 
 
-def graph_diff_calc(gdb_abs, super_ds, run):  # pylint: disable=too-many-locals
+def graph_diff_calc(
+    gdb_abs, super_ds, run, provenance=None
+):  # pylint: disable=too-many-locals
     """This function will calculate the difference between two graphs
 
     Args:
         gdb_abs (DiGraph): An abstract graph
         super_ds (str): A path to the superdataset
         run (str): A run name (branch)
+        provenance (tuple): The (nodes, edges) lists of the run branch, if
+        not given the branch is scanned
 
     Returns:
         DiGraph: A difference tree
@@ -69,15 +73,15 @@ def graph_diff_calc(gdb_abs, super_ds, run):  # pylint: disable=too-many-locals
             print("node_mapping", node_mapping, run)
             print(gdb_abs_proc.nodes())
 
-            nodes_provenance, edges_provenance = graphs.prov_scan(super_ds, run)
-            gdb_provenance = nx.DiGraph()
-            gdb_provenance.add_nodes_from(nodes_provenance)
-            gdb_provenance.add_edges_from(edges_provenance)
-
-            gdb_abstract, gdb_difference = match.graph_diff(
-                gdb_abs_proc, gdb_provenance
+            if provenance is None:
+                provenance = graphs.prov_scan(super_ds, run)
+            nodes_provenance, edges_provenance = provenance
+            gdb_provenance = graphs.ProvenanceGraph.from_components(
+                nodes_provenance, edges_provenance
             )
 
+            gdb_abstract, _ = match.graph_diff(gdb_abs_proc, gdb_provenance)
+
             # We now need to get the input file/files for this job so it can
             # be passed to the pending nodes job
             clone_dataset = f"/tmp/test_{run}"
@@ -91,12 +95,13 @@ def graph_diff_calc(gdb_abs, super_ds, run):  # pylint: disable=too-many-locals
             # mark dead here (ephemeral dataset)
             utilities.sub_dead_here(clone_dataset)
 
-            next_nodes = gdb_difference.next_nodes_run()
-            for item in next_nodes:
+            # The tasks whose inputs are complete, followed as the jobs complete
+            ready_queue = match.ReadyQueue(gdb_abstract, kind="task")
+            for item in ready_queue:
                 output_datasets.extend(
                     [
                         os.path.dirname(os.path.relpath(s, super_ds))
-                        for s in gdb_abstract.graph.successors(item)
+                        for s in gdb_abstract.successors(item)
                         if os.path.exists(
                             os.path.dirname(
                                 os.path.join(
@@ -111,7 +116,7 @@ def graph_diff_calc(gdb_abs, super_ds, run):  # pylint: disable=too-many-locals
                 utilities.job_checkout(clone_dataset, item, run)
 
             status = utilities.run_pending_nodes(
-                super_ds, clone_dataset, gdb_abstract, gdb_difference, run
+                super_ds, clone_dataset, gdb_abstract, ready_queue, run
             )
             # print('status->', run, status)
 
@@ -130,15 +135,26 @@ def match_run(abstract, provenance_path, all_runs):
         provenance_path (graph): Concrete graph
         all_runs (lst): A list of branches (could also contain just one branch)
     """
-    node_abstract_list, edge_abstract_list = graphs.gcg_processing_tasks(abstract)
+    (
+        node_abstract_list,
+        edge_abstract_list,
+        multiple_producers,
+    ) = graphs.gcg_processing_tasks(abstract)
+    for handle, tasks in multiple_producers.items():
+        print(f"The file handle {handle} is an output of several tasks: {tasks}")
     gdb_abs = nx.DiGraph()
     gdb_abs.add_nodes_from(node_abstract_list)
     gdb_abs.add_edges_from(edge_abstract_list)
 
+    # The run branches share most of their history, scan them all at once
+    provenance = graphs.prov_scan_branches(provenance_path, all_runs)
+
     outputs = []
     with futures.ProcessPoolExecutor(max_workers=4) as executor:
         future_results = {
-            executor.submit(graph_diff_calc, gdb_abs, provenance_path, run)
+            executor.submit(
+                graph_diff_calc, gdb_abs, provenance_path, run, provenance[run]
+            )
             for run in all_runs
         }
 
@@ -51,83 +51,112 @@ def run_cleaning_worktree(super_ds):
     utilities.job_clean(super_ds)
 
 
-def graph_diff_calc(gdb_abs, super_ds, run):  # pylint: disable=too-many-locals
-    """Calculate the graph differences and perform necessary actions based
-      on the provided parameters.
+def translation_mapping(super_ds, run):
+    """Read the translation file of a run branch.
 
     Args:
-        gdb_abs (DiGraph): The abstract graph database.
         super_ds (str): The path to the super dataset.
-        run (str): The specific run to analyze.
+        run (str): The run branch.
 
     Returns:
-        List[str]: A list of output datasets resulting from the graph differences.
+        dict: The mapping of file handle to path, or None if the branch has no
+        translation file.
     """
-    attribute_mapping = {}
     repo = git.Repo(super_ds)
-    tree = repo.heads[run].commit.tree
-    output_datasets = []
-
-    for blob in tree.blobs:
+    for blob in repo.heads[run].commit.tree.blobs:
         if blob.name == "tf.csv":
+            attribute_mapping = {}
             translation_file_data = blob.data_stream.read().decode("utf-8").split("\n")
             for row in translation_file_data[:-1]:
                 row_splitted = row.split(",")
                 attribute_mapping[row_splitted[0]] = f"{super_ds}/{row_splitted[1]}"
+            return attribute_mapping
+    return None
 
-            gdb_abs_proc = match.graph_id_relabel(gdb_abs, attribute_mapping)
-            nodes_provenance, edges_provenance = graphs.prov_scan(super_ds, run)
-            gdb_provenance = nx.DiGraph()
-            gdb_provenance.add_nodes_from(nodes_provenance)
-            gdb_provenance.add_edges_from(edges_provenance)
 
-            gdb_abstract, gdb_difference = match.graph_diff_tasks(
-                gdb_abs_proc, gdb_provenance
+def graph_diff_calc(
+    gdb_abs, super_ds, run, provenance=None, gdb_matched=None
+):  # pylint: disable=too-many-locals,too-many-arguments
+    """Calculate the graph differences and perform necessary actions based
+      on the provided parameters.
+
+    Args:
+        gdb_abs (DiGraph): The abstract graph database.
+        super_ds (str): The path to the super dataset.
+        run (str): The specific run to analyze.
+        provenance (tuple): The (nodes, edges) lists of the run branch, if
+        not given the branch is scanned.
+        gdb_matched (DiGraph): The abstract graph already matched against the
+        run branch (see match.BatchMatcher.branch_diff), if not given the
+        graphs are matched here.
+
+    Returns:
+        List[str]: A list of output datasets resulting from the graph differences.
+    """
+    output_datasets = []
+
+    attribute_mapping = translation_mapping(super_ds, run)
+    if attribute_mapping is not None:
+        if gdb_matched is not None:
+            gdb_abstract = gdb_matched
+        else:
+            gdb_abs_proc = match.graph_id_relabel(gdb_abs, attribute_mapping)
+            if provenance is None:
+                provenance = graphs.prov_scan(super_ds, run)
+            nodes_provenance, edges_provenance = provenance
+            gdb_provenance = graphs.ProvenanceGraph.from_components(
+                nodes_provenance, edges_provenance
             )
 
-            # We now need to get the input file/files for this job so it can be passed
-            # to the pending nodes job
-            clone_dataset = f"/tmp/test_{run}"
-            print("clone_dataset", clone_dataset)
-
-            # clone the repo
-            utilities.sub_clone_flock(super_ds, clone_dataset, run)
-            print("after cloning")
-
-            # get all submodules with no data
-            utilities.sub_get(clone_dataset, True)
-
-            # mark dead here (ephemeral dataset)
-            utilities.sub_dead_here(clone_dataset)
-            print("after dead here")
-
-            next_nodes = gdb_difference.next_nodes_run()
-            for item in next_nodes:
-                output_datasets.extend(
-                    [
-                        os.path.dirname(os.path.relpath(s, super_ds))
-                        for s in gdb_abstract.graph.successors(item)
-                        if os.path.exists(
-                            os.path.dirname(
-                                os.path.join(
-                                    clone_dataset, os.path.relpath(s, super_ds)
-                                )
-                            )
+            gdb_abstract, _ = match.graph_diff_tasks(gdb_abs_proc, gdb_provenance)
+
+        # We now need to get the input file/files for this job so it can be passed
+        # to the pending nodes job
+        clone_dataset = f"/tmp/test_{run}"
+        print("clone_dataset", clone_dataset)
+
+        # clone the repo
+        utilities.sub_clone_flock(super_ds, clone_dataset, run)
+        print("after cloning")
+
+        # get all submodules with no data
+        utilities.sub_get(clone_dataset, True)
+
+        # mark dead here (ephemeral dataset)
+        utilities.sub_dead_here(clone_dataset)
+        print("after dead here")
+
+        # The tasks whose inputs are complete, followed as the jobs complete
+        # and taken by critical path (PCE) priority
+        ready_queue = match.ReadyQueue(
+            gdb_abstract,
+            kind="task",
+            priority=match.critical_path_priority(gdb_abstract).get,
+        )
+        for item in ready_queue:
+            output_datasets.extend(
+                [
+                    os.path.dirname(os.path.relpath(s, super_ds))
+                    for s in gdb_abstract.successors(item)
+                    if os.path.exists(
+                        os.path.dirname(
+                            os.path.join(clone_dataset, os.path.relpath(s, super_ds))
                         )
-                    ]
-                )
+                    )
+                ]
+            )
 
-            for item in output_datasets:
-                utilities.job_checkout(clone_dataset, item, run)
+        for item in output_datasets:
+            utilities.job_checkout(clone_dataset, item, run)
 
-            status = utilities.run_pending_nodes(
-                super_ds, clone_dataset, gdb_abstract, gdb_difference, run
-            )
-            # print('status->', run, status)
+        status = utilities.run_pending_nodes(
+            super_ds, clone_dataset, gdb_abstract, ready_queue, run
+        )
+        # print('status->', run, status)
 
-            if status is not None:
-                for item in output_datasets:
-                    utilities.sub_push_flock(clone_dataset, item, "origin")
+        if status is not None:
+            for item in output_datasets:
+                utilities.sub_push_flock(clone_dataset, item, "origin")
 
     return output_datasets
 
@@ -140,16 +169,50 @@ def match_run(abstract, provenance_path, branch):
         provenance_path (graph): Concrete graph
         branch (lst): A list of branches (could also contain just one branch)
     """
-    node_abstract_list, edge_abstract_list = graphs.gcg_processing_tasks(abstract)
+    (
+        node_abstract_list,
+        edge_abstract_list,
+        multiple_producers,
+    ) = graphs.gcg_processing_tasks(abstract)
+    for handle, tasks in multiple_producers.items():
+        print(f"The file handle {handle} is an output of several tasks: {tasks}")
     gdb_abs = nx.DiGraph()
     gdb_abs.add_nodes_from(node_abstract_list)
     gdb_abs.add_edges_from(edge_abstract_list)
 
+    # The run branches share most of their history, scan them all at once
+    provenance = graphs.prov_scan_branches(provenance_path, branch)
+
+    # Match the abstract graph against all the run branches in one pass, the
+    # branches without a translation file are left out as before
+    mappings = {run: translation_mapping(provenance_path, run) for run in branch}
+    runs = [run for run in branch if mappings[run] is not None]
+
+    # A task whose inputs changed since it ran is matched as pending, so only
+    # the outdated runs are scheduled again
+    fresh_ids = {}
+    for run in runs:
+        nodes_provenance, _ = provenance[run]
+        fresh_ids[run] = match.StalenessTracker(nodes_provenance).fresh_ids(
+            {attrs["ID"] for _, attrs in nodes_provenance}
+        )
+
+    batch = match.BatchMatcher(gdb_abs, fresh_ids, mappings)
+    ready = batch.ready_sets()
+
     outputs = []
     with futures.ProcessPoolExecutor(max_workers=4) as executor:
         future_results = {
-            executor.submit(graph_diff_calc, gdb_abs, provenance_path, run)
-            for run in branch
+            executor.submit(
+                graph_diff_calc,
+                gdb_abs,
+                provenance_path,
+                run,
+                provenance[run],
+                batch.branch_diff(run)[0],
+            )
+            for run in runs
+            if ready[run]
         }
 
         for future in futures.as_completed(future_results):
@@ -1,15 +1,29 @@
 """Init module for utilities."""
-from .base_conversions import decode, encode  # pylint: disable=import-error
+from .base_conversions import (  # pylint: disable=import-error
+    decode,
+    encode,
+    file_id,
+    task_id,
+    task_id_readable,
+)
 from .git_utils import (  # pylint: disable=import-error
+    GitTreeReader,
+    RunCommit,
     branch_save,
     commit_message_node_extract,
     get_branches,
     get_commit_list,
     get_dataset,
     get_git_root,
+    get_gitshasums,
+    get_repo,
     get_superdataset,
     git_merge,
+    invalidate_git_cache,
     job_checkout,
+    run_commits_count,
+    run_commits_iter,
+    run_record_parse,
     sub_clone_flock,
     sub_dead_here,
     sub_get,
@@ -22,27 +36,42 @@ from .jobs import (  # pylint: disable=import-error
     run_pending_nodes,
 )
 from .paths_utils import (  # pylint: disable=import-error
+    PathIndex,
     exists_case_sensitive,
     full_path_from_partial,
     is_tool,
 )
 from .string_manip import (  # pylint: disable=import-error
+    HandleMatcher,
     file_name_expansion,
     line_process_file,
     line_process_task,
     line_process_task_v2,
     remove_space,
 )
+from .workflow_reader import (  # pylint: disable=import-error
+    WorkflowFormatError,
+    read_workflow,
+)
 
 __all__ = [
     "is_tool",
     "exists_case_sensitive",
     "full_path_from_partial",
+    "PathIndex",
     "get_commit_list",
+    "run_commits_count",
+    "run_commits_iter",
+    "RunCommit",
     "commit_message_node_extract",
+    "run_record_parse",
     "get_dataset",
     "get_superdataset",
     "get_git_root",
+    "get_gitshasums",
+    "get_repo",
+    "invalidate_git_cache",
+    "GitTreeReader",
     "get_branches",
     "sub_clone_flock",
     "sub_get",
@@ -60,6 +89,12 @@ __all__ = [
     "line_process_task_v2",
     "file_name_expansion",
     "remove_space",
+    "HandleMatcher",
+    "read_workflow",
+    "WorkflowFormatError",
     "encode",
     "decode",
+    "file_id",
+    "task_id",
+    "task_id_readable",
 ]
@@ -1,5 +1,9 @@
-"""This module will encode and decode messages to base 64 and vice-versa"""
+"""This module will encode and decode messages to base 64 and vice-versa,
+and build the canonical IDs of graph nodes"""
 import base64
+import hashlib
+
+ID_DIGEST_SIZE = 16
 
 
 def encode(message):
@@ -28,3 +32,57 @@ def decode(base64_message):
     base64_bytes = base64_message.encode("ascii")
     message_bytes = base64.b64decode(base64_bytes)
     return message_bytes.decode("ascii")  # original message
+
+
+def task_id(inputs, outputs, command):
+    """A function to build the canonical ID of a task
+
+    The ID is a fixed size blake2b digest over the sorted inputs, the sorted
+    outputs and the command, so it can be compared in constant time however
+    many files the task has. Both the provenance and the abstract graphs
+    build it from the same normalised tuple.
+
+    Args:
+        inputs (iterable): The input file paths
+        outputs (iterable): The output file paths
+        command (str): The command of the task
+
+    Returns:
+        str: The hexadecimal digest
+    """
+    digest = hashlib.blake2b(b"task\0", digest_size=ID_DIGEST_SIZE)
+    for paths in (inputs, outputs):
+        for path in sorted(paths):
+            digest.update(path.encode("utf-8", "surrogateescape") + b"\0")
+        digest.update(b"\1")
+    digest.update(command.encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()
+
+
+def task_id_readable(inputs, outputs, command):
+    """A function to build the readable form of a task ID, for display only
+
+    Args:
+        inputs (iterable): The input file paths
+        outputs (iterable): The output file paths
+        command (str): The command of the task
+
+    Returns:
+        str: The sorted files and command, comma separated
+    """
+    return ",".join(sorted([*inputs, *outputs, command]))
+
+
+def file_id(path):
+    """A function to build the canonical ID of a file
+
+    Args:
+        path (str): The file path
+
+    Returns:
+        str: The hexadecimal blake2b digest of the path
+    """
+    return hashlib.blake2b(
+        b"file\0" + path.encode("utf-8", "surrogateescape"),
+        digest_size=ID_DIGEST_SIZE,
+    ).hexdigest()
@@ -1,8 +1,13 @@
 """This module will contain functions for git operations"""
 import ast
+import json
+import lzma
 import os
 import re
 import subprocess
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
 
 import datalad.api as dl
 import git
@@ -13,6 +18,100 @@ def get_commit_list(commits):
     return [item for item in commits if "DATALAD RUNCMD" in item.message]
 
 
+class RunCommit(NamedTuple):
+    """A lightweight record of a DATALAD RUNCMD commit."""
+
+    hexsha: str
+    author_name: str
+    authored_date: int
+    message: str
+
+
+def run_commits_iter(repo_path, revision, reverse=False, paths=()):
+    """! This function will stream the DATALAD RUNCMD commits of a revision.
+    The filtering is done by git (``git log --grep``) and the output is read
+    incrementally, so only one commit is held in memory at a time
+    Args:
+        repo_path (str): Path to the repository
+        revision (str): A revision or revision range (e.g. a branch name)
+        reverse (bool): Yield the oldest commit first
+        paths (list): Only list the commits that modified these paths
+        (relative to the repository root) or the files below them
+    Yields:
+        RunCommit: The run commits, newest first unless reverse is set
+    Raises:
+        subprocess.CalledProcessError: If git log fails
+    """
+    command = [
+        "git",
+        "-C",
+        repo_path,
+        "log",
+        "-z",
+        "--fixed-strings",
+        "--grep=DATALAD RUNCMD",
+        "--format=%H%x00%an%x00%at%x00%B",
+    ]
+    if reverse:
+        command.append("--reverse")
+    if paths:  # do not prune the side branches of merges that kept a path
+        command.append("--full-history")
+    command.extend([revision, "--", *paths])
+
+    # pylint: disable-next=consider-using-with
+    process = subprocess.Popen(command, stdout=subprocess.PIPE)
+    finished = False
+    try:
+        fields = []
+        pending = []
+        # Every field, including the last one of each commit, ends with a NUL
+        for chunk in iter(lambda: process.stdout.read1(65536), b""):
+            *complete, rest = chunk.split(b"\0")
+            for part in complete:
+                pending.append(part)
+                fields.append(b"".join(pending).decode("utf-8", errors="replace"))
+                pending = []
+                if len(fields) == 4:
+                    hexsha, author_name, authored_date, message = fields
+                    fields = []
+                    yield RunCommit(hexsha, author_name, int(authored_date), message)
+            pending.append(rest)
+        finished = True
+    finally:
+        if not finished:  # the consumer stopped early
+            process.kill()
+        process.stdout.close()
+        if process.wait() > 0:
+            raise subprocess.CalledProcessError(process.returncode, command)
+
+
+def run_commits_count(repo_path, revision):
+    """! This function will count the DATALAD RUNCMD commits of a revision,
+    without reading their messages
+    Args:
+        repo_path (str): Path to the repository
+        revision (str): A revision or revision range (e.g. a branch name)
+    Returns:
+        int: The number of run commits
+    """
+    count = subprocess.run(
+        [
+            "git",
+            "-C",
+            repo_path,
+            "rev-list",
+            "--count",
+            "--fixed-strings",
+            "--grep=DATALAD RUNCMD",
+            revision,
+            "--",
+        ],
+        stdout=subprocess.PIPE,
+        check=True,
+    ).stdout
+    return int(count)
+
+
 def commit_message_node_extract(commit):
     """
     Extracts a dictionary representing a commit message node
@@ -38,6 +137,154 @@ def commit_message_node_extract(commit):
     )
 
 
+RUN_RECORD_START = "=== Do not change lines below ==="
+RUN_RECORD_END = "^^^ Do not change lines above ^^^"
+RUN_RECORD_DIRECTORY = ".datalad/runinfo"
+
+
+def run_record_parse(message, repo_path=None, hexsha=None):
+    """! This function will return the run record of a DATALAD RUNCMD commit
+    message. The record is cut out between the markers datalad writes around
+    it (no regular expression) and decoded with ``json.loads``, falling back
+    to ``ast.literal_eval`` only for records that are not valid JSON. Large
+    records that datalad stored in a sidecar file (the message then only
+    holds the record id) are read from ``.datalad/runinfo`` in the commit
+    Args:
+        message (str): The commit message
+        repo_path (str): Path to the repository of the commit, only needed
+        for sidecar records
+        hexsha (str): The commit hexsha, only needed for sidecar records
+    Returns:
+        dict: The run record
+    Raises:
+        ValueError: If the message has no run record or a sidecar record is
+        found and no repository or commit is given
+    """
+    _, start_found, record = message.partition(RUN_RECORD_START)
+    if start_found:
+        record = record.partition(RUN_RECORD_END)[0].strip()
+    else:
+        record = message[message.find("{") : message.rfind("}") + 1]
+    if not record:
+        raise ValueError("The commit message does not contain a run record.")
+
+    if record.startswith("{"):
+        try:
+            return json.loads(record)
+        except json.JSONDecodeError:
+            return ast.literal_eval(record)
+
+    # datalad writes the id of a sidecar record as a JSON string
+    record_id = json.loads(record) if record.startswith('"') else record
+    if repo_path is None or hexsha is None:
+        raise ValueError(
+            f"The run record {record_id} is stored in a sidecar file, "
+            "a repository and commit are required to read it."
+        )
+    sidecar = subprocess.run(
+        [
+            "git",
+            "-C",
+            repo_path,
+            "show",
+            f"{hexsha}:{RUN_RECORD_DIRECTORY}/{record_id}",
+        ],
+        capture_output=True,
+        check=True,
+    ).stdout
+    # The sidecar is an xz compressed stream with one JSON record per line
+    return json.loads(lzma.decompress(sidecar).decode("utf-8").splitlines()[0])
+
+
+class _LRUCache:
+    """A thread safe least recently used cache with prefix invalidation."""
+
+    def __init__(self, maxsize, on_evict=None):
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, factory):
+        """Return the value of key, computing it with factory on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = factory()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.maxsize:
+                evicted.append(self._entries.popitem(last=False)[1])
+        for item in evicted:
+            self._evict(item)
+        return value
+
+    def invalidate(self, prefix=None):
+        """Drop every entry, or only the ones whose key is below prefix."""
+        with self._lock:
+            keys = [
+                key
+                for key in self._entries
+                if prefix is None or key == prefix or key.startswith(prefix + os.sep)
+            ]
+            evicted = [self._entries.pop(key) for key in keys]
+        for item in evicted:
+            self._evict(item)
+
+    def forget(self):
+        """Drop every entry without releasing it (it is owned by another process)."""
+        with self._lock:
+            self._entries = OrderedDict()
+
+    def _evict(self, item):
+        if self.on_evict is not None and item is not None:
+            self.on_evict(item)
+
+
+# Process-wide caches: directory -> git root, git root -> Repo handle and
+# dataset path -> (super)dataset. Call invalidate_git_cache when datasets are
+# created, moved or removed.
+_GIT_ROOTS = _LRUCache(maxsize=4096)
+_REPOS = _LRUCache(maxsize=64, on_evict=lambda repo: repo.close())
+_DATASETS = _LRUCache(maxsize=256)
+_SUPERDATASETS = _LRUCache(maxsize=256)
+
+
+def _git_cache_forget():
+    # A forked worker must not share the git processes of its parent's handles
+    for cache in (_GIT_ROOTS, _REPOS, _DATASETS, _SUPERDATASETS):
+        cache.forget()
+
+
+os.register_at_fork(after_in_child=_git_cache_forget)
+
+
+def invalidate_git_cache(path=None):
+    """! This function will invalidate the cached git roots, repositories and
+    datasets, all of them or only those at or below a path
+    Args:
+        path (str): A path whose cached lookups are dropped, all if None
+    """
+    if path is not None:
+        path = os.path.realpath(path)
+    for cache in (_GIT_ROOTS, _REPOS, _DATASETS, _SUPERDATASETS):
+        cache.invalidate(path)
+
+
+def _directory_git_root(directory):
+    """Return the root of the repository containing a directory, or None."""
+    if os.path.lexists(os.path.join(directory, ".git")):
+        return directory
+    parent = os.path.dirname(directory)
+    if parent == directory:
+        return None
+    # Every parent is cached too, so sibling paths resolve without a stat
+    return _GIT_ROOTS.get(parent, lambda: _directory_git_root(parent))
+
+
 def get_dataset(dataset):
     """! This function will return a Datalad dataset for the given path
     Args:
@@ -45,7 +292,7 @@ def get_dataset(dataset):
     Returns:
         dset (Dataset): A Datalad dataset
     """
-    dset = dl.Dataset(dataset)
+    dset = _DATASETS.get(os.path.realpath(dataset), lambda: dl.Dataset(dataset))
     if dset is not None:
         return dset
     raise Exception("""Dataset not valid.""")
@@ -56,28 +303,204 @@ def get_superdataset(dataset: str) -> dl.Dataset:
     Returns:
         sds/dset (Dataset): A datalad superdataset
     """
-    dset = dl.Dataset(dataset)
-    sds = dset.get_superdataset()
 
-    if sds is not None:  # pylint: disable = no-else-return
-        return sds
-    else:
-        return dset
+    def superdataset_lookup():
+        dset = get_dataset(dataset)
+        sds = dset.get_superdataset()
+
+        if sds is not None:  # pylint: disable = no-else-return
+            return sds
+        else:
+            return dset
+
+    return _SUPERDATASETS.get(os.path.realpath(dataset), superdataset_lookup)
 
 
 def get_git_root(path_file):
-    """! This function will get the git repo of a file
+    """! This function will get the git repo of a file. The lookup walks up
+    the parent directories looking for ``.git`` and is cached, so it does
+    not start any git process
     Args:
         path_initial_file (str): A path to the initial file
     Returns:
         str: The root of the git repo
+    Raises:
+        git.InvalidGitRepositoryError: If the path is not in a git repo
     """
-    git_repo = git.Repo(path_file, search_parent_directories=True)
-    git_root = git_repo.git.rev_parse("--show-toplevel")
+    path = os.path.realpath(path_file)
+    directory = path if os.path.isdir(path) else os.path.dirname(path)
+    git_root = _GIT_ROOTS.get(directory, lambda: _directory_git_root(directory))
+    if git_root is None:
+        raise git.InvalidGitRepositoryError(path_file)
 
     return git_root
 
 
+def get_repo(path):
+    """! This function will return a (cached) git repo handle
+    Args:
+        path (str): A path inside the repository
+    Returns:
+        Repo: The repository containing the path
+    """
+    git_root = get_git_root(path)
+    return _REPOS.get(git_root, lambda: git.Repo(git_root))
+
+
+def get_gitshasums(file_paths):
+    """! This function will return the gitshasum of many files at once. The
+    files are grouped by the dataset that owns them and every dataset is
+    resolved with a single ``git ls-files -s`` call
+    Args:
+        file_paths (iterable): Absolute paths to files
+    Returns:
+        dict: A mapping of file path to gitshasum, files not tracked by git
+        are left out
+    """
+    paths_by_root = {}
+    for file_path in file_paths:
+        git_root = get_git_root(os.path.dirname(file_path))
+        # Only the directory is resolved, annexed files are symlinks into
+        # .git/annex/objects and are tracked under their own name
+        relative_path = os.path.relpath(
+            os.path.join(
+                os.path.realpath(os.path.dirname(file_path)),
+                os.path.basename(file_path),
+            ),
+            git_root,
+        )
+        paths_by_root.setdefault(git_root, {})[relative_path] = file_path
+
+    shasums = {}
+    for git_root, relative_paths in paths_by_root.items():
+        ls_files_output = subprocess.run(
+            ["git", "-C", git_root, "ls-files", "--stage", "-z"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        for entry in ls_files_output.stdout.split("\0"):
+            if not entry:
+                continue
+            # <mode> SP <object> SP <stage> TAB <file>
+            entry_info, relative_path = entry.split("\t", 1)
+            if relative_path in relative_paths:
+                shasums[relative_paths[relative_path]] = entry_info.split(" ")[1]
+
+    return shasums
+
+
+class GitTreeReader:
+    """! Read the object ids of paths in the tree of a commit
+
+    Lookups are answered by long-lived ``git cat-file --batch-check``
+    processes (one per repository) so no checkout and no per-file command is
+    needed. Paths that live in a subdataset are followed through the gitlink
+    recorded in the commit, which pins them to the subdataset commit that was
+    current when the run was saved.
+    """
+
+    GITLINK_MODE = b"160000"
+
+    def __init__(self):
+        self._processes = {}
+        self._trees = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Terminate the cat-file processes."""
+        for process in self._processes.values():
+            process.stdin.close()
+            process.wait()
+        self._processes = {}
+
+    def _process(self, git_root, batch_option):
+        """Return the cat-file process of a repository, starting it if needed."""
+        key = (git_root, batch_option)
+        if key not in self._processes:
+            # pylint: disable-next=consider-using-with
+            self._processes[key] = subprocess.Popen(
+                ["git", "-C", git_root, "cat-file", batch_option],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+        return self._processes[key]
+
+    def _object_info(self, git_root, object_name):
+        """Return the (object id, type, size) of an object or None if missing."""
+        process = self._process(git_root, "--batch-check")
+        process.stdin.write(object_name.encode("utf-8") + b"\n")
+        process.stdin.flush()
+        reply = process.stdout.readline().rstrip(b"\n")
+        # "<name> missing" or "<name> ambiguous", the name may contain spaces
+        if reply.endswith((b" missing", b" ambiguous")):
+            return None
+        object_id, object_type, size = reply.split(b" ")
+        return object_id.decode("ascii"), object_type, int(size)
+
+    def _tree_entries(self, git_root, tree_name):
+        """Return the entries of a tree as a mapping name -> (mode, object id)."""
+        info = self._object_info(git_root, tree_name)
+        if info is None or info[1] != b"tree":
+            return None
+        if info[0] not in self._trees:
+            process = self._process(git_root, "--batch")
+            process.stdin.write(info[0].encode("ascii") + b"\n")
+            process.stdin.flush()
+            process.stdout.readline()  # header, same as the batch-check one
+            content = process.stdout.read(info[2] + 1)[:-1]
+            entries = {}
+            position = 0
+            while position < len(content):
+                # <mode> SP <name> NUL <20 byte object id>
+                name_end = content.index(b"\0", position)
+                mode, name = content[position:name_end].split(b" ", 1)
+                object_id = content[name_end + 1 : name_end + 21].hex()
+                entries[name.decode("utf-8")] = (mode, object_id)
+                position = name_end + 21
+            self._trees[info[0]] = entries
+        return self._trees[info[0]]
+
+    def gitshasum(self, git_root, commit, relative_path):
+        """! Return the object id of a path in the tree of a commit
+
+        Args:
+            git_root (str): The root of the repository containing the commit
+            commit (str): A commit hexsha (or any tree-ish)
+            relative_path (str): A path relative to git_root
+
+        Returns:
+            str: The object id (gitshasum) of the path or None if the path
+            does not exist in that commit
+        """
+        relative_path = relative_path.replace(os.sep, "/").strip("/")
+        info = self._object_info(git_root, f"{commit}:{relative_path}")
+        if info is not None:
+            return info[0]
+
+        # The path is either missing or inside a subdataset, in which case
+        # cat-file cannot see through the gitlink, walk the trees to find it
+        parts = relative_path.split("/")
+        for i, part in enumerate(parts[:-1]):
+            entries = self._tree_entries(git_root, f"{commit}:{'/'.join(parts[:i])}")
+            if entries is None or part not in entries:
+                return None
+            mode, object_id = entries[part]
+            if mode == self.GITLINK_MODE:
+                subdataset_root = os.path.join(git_root, *parts[: i + 1])
+                if not os.path.isdir(subdataset_root):  # subdataset not installed
+                    return None
+                return self.gitshasum(
+                    subdataset_root, object_id, "/".join(parts[i + 1 :])
+                )
+        return None
+
+
 def get_branches(path_dataset):
     """This function will return all the branches of a datalad project except
       for git-annex which is not main nor an orphan branch
@@ -88,7 +511,7 @@ def get_branches(path_dataset):
     Returns:
         list: A list of all branches
     """
-    repo = git.Repo(path_dataset)
+    repo = get_repo(path_dataset)
     repo_heads = repo.heads  # or it's alias: r.branches
     repo_heads_names = [h.name for h in repo_heads]
     repo_heads_names.remove("git-annex")
@@ -87,20 +87,22 @@ def job_clean(dataset):
     print("logs", outlogs, errlogs)
 
 
-def run_pending_nodes(original_ds, dataset, gdb_abstract, gdb_difference, branch):
+def run_pending_nodes(original_ds, dataset, gdb_abstract, ready_queue, branch):
     """Process the next nodes to be run, generating inputs and outputs for a job.
 
-    This method extracts information from the specified graph databases
-      (`gdb_difference`
-    and `gdb_abstract`) to determine the inputs and outputs for the next nodes to be
-    executed. It then constructs paths relative to the dataset and checks the existence
-    of the necessary directories. If all conditions are met, it extracts the command
-    associated with the nodes and submits a job.
+    This method takes the next nodes to be executed from the ready queue of
+    the abstract graph (`gdb_abstract`) and extracts their inputs and outputs
+    from the graph. It then constructs paths relative to the dataset and checks
+    the existence of the necessary directories. If all conditions are met, it
+    extracts the command associated with the nodes and submits a job. The node
+    is running in the queue while the job runs, it is marked as done if the job
+    succeeds and put back in the queue if it fails.
 
     Args:
         dataset (str): The path to the DataLad dataset.
         branch (str): The branch to which the job belongs.
-        gdb_difference: Graph database representing the differences between datasets.
+        ready_queue (match.ReadyQueue): The tasks of the abstract graph that are
+          ready to run.
         gdb_abstract: Graph database representing the abstract representation of
           the workflow.
         original_ds (str): The path to the original dataset.
@@ -112,7 +114,7 @@ def run_pending_nodes(original_ds, dataset, gdb_abstract, gdb_difference, branch
     inputs = []
     outputs = []
     # try:
-    next_nodes_req = gdb_difference.next_nodes_run()
+    next_nodes_req = list(ready_queue)
     print("next_nodes_req", next_nodes_req, "branch->", branch)
 
     for item in next_nodes_req:
@@ -133,10 +135,19 @@ def run_pending_nodes(original_ds, dataset, gdb_abstract, gdb_difference, branch
             if all(os.path.exists(os.path.dirname(f)) for f in outputs) and all(
                 os.path.exists(os.path.dirname(f)) for f in inputs
             ):
-                command = gdb_difference.nodes[item]["cmd"]
+                command = gdb_abstract.nodes[item]["cmd"]
                 message = "test"
 
-                return job_submit(dataset, branch, inputs, outputs, message, command)
+                ready_queue.take(item)
+                try:
+                    job_submit_result = job_submit(
+                        dataset, branch, inputs, outputs, message, command
+                    )
+                except Exception:
+                    ready_queue.requeue(item)
+                    raise
+                ready_queue.done(item)
+                return job_submit_result
 
     return None
 
@@ -1,5 +1,6 @@
 """This module provides utilities for path manipulations"""
-import glob
+import bisect
+import itertools
 import os
 from pathlib import Path
 from shutil import which
@@ -37,18 +38,110 @@ def exists_case_sensitive(path) -> bool:
     return designated_path in designated_path.parent.iterdir()
 
 
-def full_path_from_partial(top_level_path: str, relative_path: str) -> str:
+class PathIndex:
+    """! An index of the paths below a top level path
+
+    The tree is walked once and every file and directory is registered under
+    its basename and under each of its path suffixes ("c.txt", "b/c.txt",
+    "a/b/c.txt"), so a partial path is resolved with a dictionary lookup
+    instead of a recursive glob. Names ending with a basename are found by
+    bisecting the sorted reversed basenames, and paths that match nothing
+    are remembered, so misses do not scan the index either. Hidden entries
+    are skipped, as glob does.
+    """
+
+    def __init__(self, top_level_path: str):
+        """! Walk the tree below top_level_path and build the index
+
+        Args:
+            top_level_path (str): A top level path that contains the partial paths
+        """
+        self.top_level_path = top_level_path
+        self._by_suffix: dict[str, list[str]] = {}
+        self._missing: set[str] = set()
+        for root, dirs, files in os.walk(top_level_path):
+            dirs[:] = [name for name in dirs if not name.startswith(".")]
+            for name in dirs + files:
+                if name.startswith("."):
+                    continue
+                full_path = os.path.join(root, name)
+                parts = os.path.relpath(full_path, top_level_path).split(os.sep)
+                for i in range(len(parts)):
+                    suffix = "/".join(parts[i:])
+                    self._by_suffix.setdefault(suffix, []).append(full_path)
+
+        # Ambiguous suffixes resolve to the shallowest path, then alphabetically
+        for candidates in self._by_suffix.values():
+            candidates.sort(key=lambda path: (path.count(os.sep), path))
+        self._reversed_names = sorted(
+            name[::-1] for name in self._by_suffix if "/" not in name
+        )
+
+    def full_path(self, relative_path: str) -> str:
+        """! Return the absolute path matching a partial path
+
+        The partial path is matched on whole path components first, then on
+        its basename and finally on any name ending with the basename (the
+        behaviour of the former ``**/*basename`` glob).
+
+        Args:
+            relative_path (str): A partial path or file name
+
+        Raises:
+            FileNotFoundError: If no path under the top level path matches
+
+        Returns:
+            str: An absolute path
+        """
+        suffix = os.path.normpath(relative_path).replace(os.sep, "/").lstrip("/")
+        basename = os.path.basename(suffix)
+        candidates = self._by_suffix.get(suffix) or self._by_suffix.get(basename)
+        if not candidates and basename not in self._missing:
+            candidates = sorted(
+                (
+                    path
+                    for name in self._names_ending_with(basename)
+                    for path in self._by_suffix[name]
+                ),
+                key=lambda path: (path.count(os.sep), path),
+            )
+            if candidates:
+                self._by_suffix[basename] = candidates
+            else:
+                self._missing.add(basename)
+        if not candidates:
+            raise FileNotFoundError(
+                f"No path matching {relative_path} under {self.top_level_path}"
+            )
+        return candidates[0]
+
+    def _names_ending_with(self, ending: str) -> list[str]:
+        """Return the registered basenames ending with a string."""
+        reversed_ending = ending[::-1]
+        start = bisect.bisect_left(self._reversed_names, reversed_ending)
+        names = []
+        for name in itertools.islice(self._reversed_names, start, None):
+            if not name.startswith(reversed_ending):
+                break
+            names.append(name[::-1])
+        return names
+
+
+def full_path_from_partial(
+    top_level_path: str, relative_path: str, path_index: PathIndex | None = None
+) -> str:
     """This function will return an absolute path from a partial path an a
     top level path
 
     Args:
         top_level_path (str): A top level path that contains the partial path
         relative_path (str): A partial path or file name
+        path_index (PathIndex): An index of top_level_path to reuse across
+        lookups, if not given the tree is indexed for this lookup only
 
     Returns:
         str: An absolute path
     """
-    return glob.glob(
-        top_level_path + f"/**/*{os.path.basename(relative_path)}",
-        recursive=True,
-    )[0]
+    if path_index is None:
+        path_index = PathIndex(top_level_path)
+    return path_index.full_path(relative_path)
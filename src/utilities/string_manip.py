@@ -130,3 +130,69 @@ def file_name_expansion(item):
             files.append(item)
 
     return files
+
+
+def _trie_pattern(trie):
+    """Return a regular expression matching the longest key of a trie."""
+    branches = [
+        re.escape(char) + _trie_pattern(child)
+        for char, child in sorted(trie.items())
+        if char
+    ]
+    if not branches:
+        return ""
+    if len(branches) == 1 and "" not in trie:
+        return branches[0]
+    pattern = f"(?:{'|'.join(branches)})"
+    # A greedy optional group tries the longer handles first
+    return f"{pattern}?" if "" in trie else pattern
+
+
+class HandleMatcher:
+    """! Substitute file handles in strings in a single pass
+
+    The handles of a translation map are stored in a trie, compiled into a
+    single regular expression that scans a string once and, at every
+    position, matches the longest handle starting there. A handle that is a
+    prefix of another one (``in1`` and ``in10``) is therefore never replaced
+    inside the longer one, and a path that was substituted in is never
+    scanned again. The matcher is built once per map and reused for every
+    command.
+    """
+
+    def __init__(self, mapping):
+        """! Compile the handles of a map
+
+        Args:
+            mapping (dict): A mapping of handle to its replacement
+        """
+        self.mapping = {handle: str(path) for handle, path in mapping.items() if handle}
+        trie = {}
+        for handle in self.mapping:
+            node = trie
+            for char in handle:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        self.pattern = re.compile(_trie_pattern(trie)) if trie else None
+
+    def substitute(self, text, handles=None):
+        """! Replace the handles found in a string
+
+        Args:
+            text (str): The string, e.g. a command
+            handles (container): Only replace these handles, the other ones
+            are left as they are. By default all the handles are replaced
+
+        Returns:
+            str: The string with the handles replaced
+        """
+        if self.pattern is None:
+            return text
+
+        def replacement(found):
+            handle = found.group(0)
+            if handles is not None and handle not in handles:
+                return handle
+            return self.mapping[handle]
+
+        return self.pattern.sub(replacement, text)
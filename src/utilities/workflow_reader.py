@@ -0,0 +1,113 @@
+"""Streaming reader of abstract workflow files"""
+import mmap
+import os
+
+FIELD_SEPARATOR = "<>"
+
+# Minimum number of fields of the task rows, by format version, and file rows
+TASK_FIELDS = {1: 5, 2: 8}
+FILE_FIELDS = 3
+
+# The mapped file is decoded and split in blocks of about this size
+BLOCK_BYTES = 4 * 2**20
+
+
+class WorkflowFormatError(ValueError):
+    """Exception when rows of a workflow file are malformed."""
+
+    def __init__(self, filename, line_numbers):
+        self.filename = filename
+        self.line_numbers = line_numbers
+        shown = ", ".join(str(number) for number in line_numbers[:20])
+        if len(line_numbers) > 20:
+            shown += f", ... ({len(line_numbers)} rows)"
+        super().__init__(f"Incorrect file format in {filename}, check line(s) {shown}")
+
+
+def _parse_line(line, task_version):
+    """Split a line once and return its (kind, values), None if malformed.
+
+    The values are the ones returned by line_process_task (version 1),
+    line_process_task_v2 (version 2) and line_process_file. Blank lines and
+    rows of other kinds give a kind of None.
+    """
+    fields = line.rstrip().split(FIELD_SEPARATOR)
+    kind = fields[0].strip()
+    if kind == "T":
+        needed = TASK_FIELDS[task_version]
+    elif kind == "F":
+        needed = FILE_FIELDS
+    else:
+        return None, None
+    if len(fields) < needed:
+        return None
+    if kind == "F":
+        return kind, (fields[1].split(","), fields[2].split(","))
+    if task_version == 1:
+        return kind, (fields[1], fields[2].split(","), fields[3], fields[4] or "main")
+    return kind, (
+        fields[1],
+        fields[2].split(","),
+        fields[3].split(","),
+        fields[4],
+        fields[5],
+        fields[6] or "main",
+        fields[7],
+    )
+
+
+def _lines(data):
+    """Yield the lines of a mapped file, decoded in blocks of whole lines."""
+    position = 0
+    while position < len(data):
+        block_end = data.find(b"\n", min(position + BLOCK_BYTES, len(data)) - 1)
+        block_end = len(data) if block_end == -1 else block_end + 1
+        block = data[position:block_end].decode("utf-8").split("\n")
+        if not block[-1]:  # the block ends with a newline
+            block.pop()
+        yield from block
+        position = block_end
+
+
+def read_workflow(filename, task_version=2):
+    """! Read the rows of an abstract workflow file in a single pass
+
+    The file is memory mapped and decoded in blocks of whole lines of about
+    BLOCK_BYTES, so the memory used besides the rows does not depend on the
+    size of the file, and every line is split once on ``<>``. Blank lines
+    and rows that are not tasks (``T``) or files (``F``) are skipped, the
+    rows with too few fields are all reported at once.
+
+    Args:
+        filename (str): Path to the abstract workflow file
+        task_version (int): The format of the task rows, 1 for
+        T<>task<>predecessors<>command<>workflow and 2 for
+        T<>task<>inputs<>outputs<>command<>PCE<>subworkflow<>message
+
+    Returns:
+        list: The (kind, values) tuples of the rows, in the order of the file,
+        with the values returned by line_process_task, line_process_task_v2
+        or line_process_file
+
+    Raises:
+        WorkflowFormatError: If rows have too few fields, with their line
+        numbers
+    """
+    if os.path.getsize(filename) == 0:
+        return []
+
+    rows = []
+    malformed = []
+    with open(filename, "rb") as file_abstract, mmap.mmap(
+        file_abstract.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        for line_number, line in enumerate(_lines(data), start=1):
+            row = _parse_line(line, task_version)
+            if row is None:
+                malformed.append(line_number)
+            elif row[0] is not None:
+                rows.append(row)
+
+    if malformed:
+        raise WorkflowFormatError(filename, malformed)
+    return rows
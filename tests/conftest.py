@@ -0,0 +1,58 @@
+"""Fixtures building small DataLad datasets with run commits"""
+import os
+
+import datalad.api as dl
+import pytest
+
+
+def write(path, text):
+    """Write a file, creating its directory."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+
+
+def _run(dataset, inputs, outputs, sidecar=False):
+    """Record a datalad run concatenating the inputs into the outputs."""
+    command = " && ".join(f"cat {' '.join(inputs)} > {output}" for output in outputs)
+    # Paths are relative to the dataset when run is a method of the dataset
+    dl.Dataset(dataset).run(
+        command,
+        inputs=inputs,
+        outputs=outputs,
+        message=f"make {' '.join(outputs)}",
+        sidecar=sidecar,
+        result_renderer="disabled",
+    )
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """Return a dataset without annex holding data/in.txt."""
+    path = str(tmp_path / "ds")
+    dl.create(
+        path, annex=False, result_renderer="disabled"
+    )  # pylint: disable=no-member
+    write(os.path.join(path, "data", "in.txt"), "in\n")
+    dl.save(dataset=path, result_renderer="disabled")  # pylint: disable=no-member
+    return path
+
+
+@pytest.fixture
+def datalad_run():
+    """Record a datalad run concatenating the inputs into the outputs."""
+    return _run
+
+
+@pytest.fixture
+def superdataset(dataset):
+    """Return a dataset with a subdataset ``sub`` holding sub/data/in.txt."""
+    subdataset = os.path.join(dataset, "sub")
+    dl.create(  # pylint: disable=no-member
+        subdataset, dataset=dataset, annex=False, result_renderer="disabled"
+    )
+    write(os.path.join(subdataset, "data", "in.txt"), "sub in\n")
+    dl.save(  # pylint: disable=no-member
+        dataset=dataset, recursive=True, result_renderer="disabled"
+    )
+    return dataset
@@ -0,0 +1,19 @@
+"""Tests of the task graph generated from an abstract workflow"""
+import graphs
+
+
+def test_gcg_processing_tasks_returns_multiple_producers(tmp_path, capsys):
+    """A handle written by several tasks is returned, not printed."""
+    abstract = tmp_path / "workflow.txt"
+    abstract.write_text(
+        "T<>first<>in.txt<>out.txt<>cp in.txt out.txt<>pce<>main<>first\n"
+        "T<>second<>in.txt<>out.txt<>cp in.txt out.txt<>pce<>main<>second\n"
+        "T<>third<>out.txt<>end.txt<>cp out.txt end.txt<>pce<>main<>third\n"
+    )
+
+    nodes, edges, multiple_producers = graphs.gcg_processing_tasks(str(abstract))
+
+    assert [task for task, _ in nodes] == ["first", "second", "third"]
+    assert edges == [("first", "third"), ("second", "third")]
+    assert multiple_producers == {"out.txt": ["first", "second"]}
+    assert not capsys.readouterr().out
@@ -0,0 +1,76 @@
+"""Tests of the node records of provenance graphs"""
+import pytest
+
+import graphs
+
+
+def test_records_have_the_attributes_of_the_node_dicts():
+    """The stored timestamp and path tuples are not node attributes."""
+    file = graphs.FileNode("ds", "data/in.txt", "c0ffee", "author", 0, "sha")
+    task = graphs.TaskNode(
+        "ds",
+        "cp data/in.txt out.txt",
+        "c0ffee",
+        "author",
+        0,
+        ["data/in.txt"],
+        ["out.txt"],
+    )
+
+    assert set(file) == {
+        "dataset",
+        "path",
+        "commit",
+        "author",
+        "date",
+        "status",
+        "ID",
+        "ID_readable",
+    }
+    assert set(task) == {
+        "dataset",
+        "command",
+        "commit",
+        "author",
+        "date",
+        "inputs",
+        "outputs",
+        "ID",
+        "ID_readable",
+    }
+    assert file["date"] == task["date"] == "1970-01-01 00:00:00"
+    assert file.timestamp == task.timestamp == 0
+    assert task.input_paths == ("data/in.txt",)
+    with pytest.raises(KeyError):
+        task["input_paths"]  # pylint: disable=pointless-statement
+
+
+def test_record_copy_replaces_fields():
+    """A copy with other paths derives its attributes from them."""
+    task = graphs.TaskNode("ds", "cp a b", "c0ffee", "author", 0, ["a"], ["b"])
+    task["note"] = "kept"
+
+    moved = task.copy(input_paths=["sub/a"], output_paths=["sub/b"])
+
+    assert moved["inputs"] == "sub/a"
+    assert moved["outputs"] == "sub/b"
+    assert (
+        moved["ID"]
+        == graphs.TaskNode("ds", "cp a b", "c0ffee", "author", 0, ["sub/a"], ["sub/b"])[
+            "ID"
+        ]
+    )
+    assert moved["note"] == "kept"
+    assert task["inputs"] == "a"
+
+
+def test_node_record_is_abstract():
+    """A record type must derive its computed attributes."""
+
+    class Incomplete(graphs.NodeRecord):  # pylint: disable=abstract-method
+        """A record without _computed."""
+
+        __slots__ = ()
+
+    with pytest.raises(TypeError):
+        Incomplete()
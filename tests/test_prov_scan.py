@@ -0,0 +1,70 @@
+"""Tests of the provenance scans"""
+import os
+
+import datalad.api as dl
+import networkx as nx
+
+import graphs
+
+
+def test_recursive_scan_links_subdataset_outputs(superdataset, datalad_run):
+    """A superdataset run reading a subdataset output is linked to its run."""
+    subdataset = os.path.join(superdataset, "sub")
+    datalad_run(subdataset, ["data/in.txt"], ["data/out.txt"])
+    dl.save(
+        dataset=superdataset, result_renderer="disabled"
+    )  # pylint: disable=no-member
+    datalad_run(superdataset, ["sub/data/out.txt"], ["data/out.txt"])
+
+    nodes, edges = graphs.prov_scan(
+        superdataset, "HEAD", use_index=False, recursive=True
+    )
+    graph = graphs.ProvenanceGraph.from_components(nodes, edges)
+
+    # The files of the same relative path in both datasets stay apart
+    assert {"sub/data/in.txt", "sub/data/out.txt", "data/out.txt"} <= set(graph)
+    assert graph.nodes["sub/data/out.txt"]["path"] == "sub/data/out.txt"
+    assert graph.nodes["sub/data/out.txt"]["dataset"] == subdataset
+    assert graph.nodes["data/out.txt"]["dataset"] == superdataset
+    assert nx.has_path(graph, "sub/data/in.txt", "data/out.txt")
+
+
+def test_recursive_scan_index_matches_full_scan(superdataset, datalad_run):
+    """The indexed recursive scan returns the components of a full scan."""
+    subdataset = os.path.join(superdataset, "sub")
+    datalad_run(subdataset, ["data/in.txt"], ["data/out.txt"])
+    dl.save(
+        dataset=superdataset, result_renderer="disabled"
+    )  # pylint: disable=no-member
+    datalad_run(superdataset, ["sub/data/out.txt"], ["data/out.txt"])
+
+    full = graphs.prov_scan(superdataset, "HEAD", use_index=False, recursive=True)
+    for _ in range(2):  # build the index, then read it back
+        nodes, edges = graphs.prov_scan(superdataset, "HEAD", recursive=True)
+        assert [(node, dict(record)) for node, record in nodes] == [
+            (node, dict(record)) for node, record in full[0]
+        ]
+        assert edges == full[1]
+
+
+def test_path_scan_keeps_directory_outputs(dataset, datalad_run):
+    """A run recorded with a directory output produced the files below it."""
+    datalad_run(dataset, ["data/in.txt"], ["mid.txt"])
+    datalad_run(dataset, ["data/in.txt"], ["other.txt"])
+    # Recorded with the directory as output (-o data), writes data/out.txt
+    dl.Dataset(dataset).run(  # pylint: disable=no-member
+        "cat mid.txt > data/out.txt",
+        inputs=["mid.txt"],
+        outputs=["data"],
+        result_renderer="disabled",
+    )
+
+    nodes, edges = graphs.prov_scan_paths(dataset, "HEAD", ["data/out.txt"])
+    graph = graphs.ProvenanceGraph.from_components(nodes, edges)
+    commands = {
+        attrs["command"] for _, attrs in graph.nodes(data=True) if "command" in attrs
+    }
+    assert commands == {
+        "cat mid.txt > data/out.txt",
+        "cat data/in.txt > mid.txt",
+    }
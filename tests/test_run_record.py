@@ -0,0 +1,43 @@
+"""Tests of the run record parser"""
+import subprocess
+
+import pytest
+
+from utilities import run_commits_iter, run_record_parse
+
+
+def test_inline_record(dataset, datalad_run):
+    """An inline record is decoded from the commit message."""
+    datalad_run(dataset, ["data/in.txt"], ["data/out.txt"])
+    commit = next(run_commits_iter(dataset, "HEAD"))
+    record = run_record_parse(commit.message)
+    assert record["inputs"] == ["data/in.txt"]
+    assert record["outputs"] == ["data/out.txt"]
+
+
+def test_sidecar_record(dataset, datalad_run):
+    """A sidecar record is read from .datalad/runinfo through its quoted id."""
+    datalad_run(dataset, ["data/in.txt"], ["data/out.txt"], sidecar=True)
+    commit = next(run_commits_iter(dataset, "HEAD"))
+    assert '"{' not in commit.message  # only the quoted record id
+    record = run_record_parse(commit.message, dataset, commit.hexsha)
+    assert record["inputs"] == ["data/in.txt"]
+    assert record["outputs"] == ["data/out.txt"]
+    assert record["cmd"] == "cat data/in.txt > data/out.txt"
+
+
+def test_sidecar_record_needs_commit(dataset, datalad_run):
+    """A sidecar record cannot be read without the repository and commit."""
+    datalad_run(dataset, ["data/in.txt"], ["data/out.txt"], sidecar=True)
+    commit = next(run_commits_iter(dataset, "HEAD"))
+    with pytest.raises(ValueError, match="sidecar"):
+        run_record_parse(commit.message)
+
+
+def test_missing_sidecar_file(dataset, datalad_run):
+    """An unknown sidecar id is reported by git."""
+    datalad_run(dataset, ["data/in.txt"], ["data/out.txt"], sidecar=True)
+    commit = next(run_commits_iter(dataset, "HEAD"))
+    message = commit.message.replace(commit.message.split('"')[1], "0" * 32)
+    with pytest.raises(subprocess.CalledProcessError):
+        run_record_parse(message, dataset, commit.hexsha)